@@ -0,0 +1,439 @@
+import os
+import sys
+import time
+import random
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from main import (WIDTH, HEIGHT, DIFFICULTIES, RAINBOW_COLORS, WIND_FORCE, WIND_GUST, GameState, Weather, JUMP,
+                  SPAWN_PIPE, SPAWN_COIN, SPAWN_POWERUP, SPAWN_HEART, SPAWN_ENEMY, mission_defs)
+
+# Размеры объектов — те же, что в классах Bird, Pipe, Coin, PowerUp, Heart, Enemy
+BIRD_X, BIRD_W, BIRD_H = 60, 40, 30
+PIPE_W, PIPE_GAP = 70, 150
+COIN_SIZE = POWERUP_SIZE = 25
+HEART_SIZE = 30
+ENEMY_SIZE = 40
+
+# Интервалы появления (как в LevelStream). Монета или сердце, как и там,
+# ждут первую трубу не раньше своего тика и встают в её просвет.
+PIPE_EVERY, COIN_EVERY, POWERUP_EVERY, HEART_EVERY = 91, 151, 601, 901
+
+
+# Наименьший интервал между объектами, которые ждут трубу: их тики
+# округляются вверх до тика трубы
+def _pipe_aligned(every):
+    return PIPE_EVERY * (every // PIPE_EVERY)
+
+
+def _capacity(every, size, min_speed):
+    # Сколько объектов одного вида может одновременно быть на экране
+    lifetime = (WIDTH + size) // min_speed + 2
+    return lifetime // every + 2
+
+
+def _overlap(ax, ay, aw, ah, bx, by, bw, bh):
+    # То же условие, что в pygame.Rect.colliderect
+    return (ax < bx + bw) & (bx < ax + aw) & (ay < by + bh) & (by < ay + ah)
+
+
+# N игр сразу: птицы и все объекты хранятся в массивах NumPy.
+# Все игры спавнят объекты на одних и тех же тиках, поэтому x у труб,
+# монет, бонусов и сердец общий (K,), а маски живых объектов — (N, K).
+# Законченная игра сразу начинается заново (как в векторных средах).
+# Из погоды моделируется только ветер — остальное влияет лишь на картинку.
+class BatchGame:
+    def __init__(self, n, difficulty="Средняя", seed=None):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        self.speed = DIFFICULTIES[difficulty]["pipe_speed"]
+        self.enemy_rate = DIFFICULTIES[difficulty]["enemy_rate"]
+        self.enemy_every = self.enemy_rate + 1
+
+        # Птицы
+        self.y = np.zeros(n)
+        self.vel = np.zeros(n)
+        self.rect_y = np.zeros(n, dtype=np.int64)
+        self.health = np.zeros(n, dtype=np.int64)
+        self.lives = np.zeros(n, dtype=np.int64)
+        self.immunity = np.zeros(n, dtype=np.int64)
+        self.shield = np.zeros(n, dtype=bool)
+        self.shield_duration = np.zeros(n, dtype=np.int64)
+        self.magnet_duration = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.coins = np.zeros(n, dtype=np.int64)
+        self.hearts_collected = np.zeros(n, dtype=np.int64)
+        self.mission_targets = [(m["counter"], m["target"], m["reward"]) for m in mission_defs()]
+        self.missions = np.zeros((n, len(self.mission_targets)), dtype=bool)
+        # Уровни улучшений задаются снаружи и не сбрасываются между играми
+        self.magnet_level = np.ones(n, dtype=np.int64)
+        self.shield_level = np.ones(n, dtype=np.int64)
+        self.jump_level = np.ones(n, dtype=np.int64)
+        self.episodes = np.zeros(n, dtype=np.int64)
+        # Погода: таймер и признак ветра (как Weather)
+        self.weather_timer = np.zeros(n, dtype=np.int64)
+        self.windy = np.zeros(n, dtype=bool)
+
+        # Трубы
+        k = _capacity(PIPE_EVERY, PIPE_W, self.speed)
+        self.pipe_x = np.zeros(k, dtype=np.int64)
+        self.pipe_top = np.zeros((n, k), dtype=np.int64)
+        self.pipe_alive = np.zeros((n, k), dtype=bool)
+        self.pipe_scored = np.zeros((n, k), dtype=bool)
+        # Монеты
+        k = _capacity(_pipe_aligned(COIN_EVERY), COIN_SIZE, self.speed)
+        self.coin_x = np.zeros(k, dtype=np.int64)
+        self.coin_y = np.zeros((n, k), dtype=np.int64)
+        self.coin_alive = np.zeros((n, k), dtype=bool)
+        # Бонусы: True — щит, False — магнит
+        k = _capacity(POWERUP_EVERY, POWERUP_SIZE, self.speed)
+        self.powerup_x = np.zeros(k, dtype=np.int64)
+        self.powerup_y = np.zeros((n, k), dtype=np.int64)
+        self.powerup_shield = np.zeros((n, k), dtype=bool)
+        self.powerup_alive = np.zeros((n, k), dtype=bool)
+        # Сердца
+        k = _capacity(_pipe_aligned(HEART_EVERY), HEART_SIZE, self.speed)
+        self.heart_x = np.zeros(k, dtype=np.int64)
+        self.heart_y = np.zeros((n, k), dtype=np.int64)
+        self.heart_alive = np.zeros((n, k), dtype=bool)
+        # Враги летят с разной скоростью, поэтому x у каждого свой
+        k = _capacity(self.enemy_every, ENEMY_SIZE, 2)
+        self.enemy_x = np.zeros((n, k), dtype=np.int64)
+        self.enemy_y = np.zeros((n, k), dtype=np.int64)
+        self.enemy_speed = np.zeros((n, k), dtype=np.int64)
+        self.enemy_order = np.zeros(k, dtype=np.int64)
+        self.enemy_alive = np.zeros((n, k), dtype=bool)
+
+        self.spawned = {"pipe": 0, "coin": 0, "powerup": 0, "heart": 0, "enemy": 0}
+        self.waiting = {"coin": 0, "heart": 0}  # сколько ждут следующую трубу
+        self.ticks = 0
+        self.reset(np.ones(n, dtype=bool))
+
+    @property
+    def jump_power(self):
+        return -9 * (1 + 0.1 * (self.jump_level - 1))
+
+    def reset(self, mask):
+        self.y[mask] = HEIGHT // 2
+        self.vel[mask] = 0
+        self.rect_y[mask] = HEIGHT // 2
+        self.health[mask] = 100
+        self.lives[mask] = 3
+        self.immunity[mask] = 0
+        self.shield[mask] = False
+        self.shield_duration[mask] = 0
+        self.magnet_duration[mask] = 0
+        self.score[mask] = 0
+        self.coins[mask] = 0
+        self.hearts_collected[mask] = 0
+        self.missions[mask] = False
+        self.weather_timer[mask] = 0
+        self.windy[mask] = self.rng.integers(0, 4, int(np.count_nonzero(mask))) == 3
+        for alive in (self.pipe_alive, self.coin_alive, self.powerup_alive, self.heart_alive, self.enemy_alive):
+            alive[mask] = False
+
+    # Урон тем птицам, у которых mask == True (как GameState.hurt_bird)
+    def _hurt(self, mask):
+        self.health[mask] -= 25
+        self.immunity[mask] = 120
+        dead = mask & (self.health <= 0)
+        self.lives[dead] -= 1
+        self.health[dead] = 100
+        self.immunity[dead] = 120
+
+    # Проверка постоянных миссий из missions.json: как MissionsManager.notify,
+    # только миссии того счётчика, что изменился
+    def _missions(self, mask, counter):
+        value = {"coins": self.coins, "pipes": self.score, "hearts": self.hearts_collected}[counter]
+        for i, (name, target, reward) in enumerate(self.mission_targets):
+            if name != counter:
+                continue
+            done = mask & ~self.missions[:, i] & (value >= target)
+            self.missions[done, i] = True
+            self.coins[done] += reward
+
+    def _next_slot(self, kind, size):
+        slot = self.spawned[kind] % size
+        self.spawned[kind] += 1
+        return slot
+
+    # Монета или сердце в просвет трубы из слота p, по центру по x
+    def _place_in_gap(self, p, xs, ys, alive, kind, size):
+        for _ in range(self.waiting[kind]):
+            k = self._next_slot(kind, len(xs))
+            xs[k] = self.pipe_x[p] + (PIPE_W - size) // 2
+            ys[:, k] = self.pipe_top[:, p] + self.rng.integers(5, PIPE_GAP - size - 5, self.n, endpoint=True)
+            alive[:, k] = True
+        self.waiting[kind] = 0
+
+    def _spawn(self):
+        t = self.ticks
+        n = self.n
+        rng = self.rng
+        if t % COIN_EVERY == 0:
+            self.waiting["coin"] += 1
+        if t % HEART_EVERY == 0:
+            self.waiting["heart"] += 1
+        if t % PIPE_EVERY == 0:
+            k = self._next_slot("pipe", len(self.pipe_x))
+            self.pipe_x[k] = WIDTH
+            self.pipe_top[:, k] = rng.integers(60, HEIGHT - 220, n, endpoint=True)
+            self.pipe_alive[:, k] = True
+            self.pipe_scored[:, k] = False
+            self._place_in_gap(k, self.coin_x, self.coin_y, self.coin_alive, "coin", COIN_SIZE)
+            self._place_in_gap(k, self.heart_x, self.heart_y, self.heart_alive, "heart", HEART_SIZE)
+        if t % POWERUP_EVERY == 0:
+            k = self._next_slot("powerup", len(self.powerup_x))
+            self.powerup_x[k] = WIDTH
+            self.powerup_shield[:, k] = rng.random(n) < 0.5
+            self.powerup_y[:, k] = rng.integers(50, HEIGHT - 50, n, endpoint=True)
+            self.powerup_alive[:, k] = True
+        if t % self.enemy_every == 0:
+            k = self._next_slot("enemy", self.enemy_x.shape[1])
+            self.enemy_x[:, k] = WIDTH
+            self.enemy_speed[:, k] = rng.integers(2, 4, n, endpoint=True)
+            self.enemy_y[:, k] = rng.integers(50, HEIGHT - 50, n, endpoint=True)
+            self.enemy_order[k] = self.spawned["enemy"]
+            self.enemy_alive[:, k] = True
+
+    # Один тик всех игр. jump — булев массив (N,). Возвращает маску игр,
+    # которые закончились на этом тике и уже начаты заново.
+    def step(self, jump):
+        jump = np.asarray(jump, dtype=bool)
+        self.vel[jump] = self.jump_power[jump]
+
+        self.ticks += 1
+        self._spawn()
+        speed = self.speed
+
+        # Weather.update и apply_effect
+        self.weather_timer += 1
+        change = self.weather_timer > 1800
+        if change.any():
+            self.weather_timer[change] = 0
+            self.windy[change] = self.rng.integers(0, 4, int(change.sum())) == 3
+        gust = np.where((self.weather_timer // WIND_GUST) % 2 == 1, WIND_FORCE, -WIND_FORCE)
+        self.vel += np.where(self.windy, gust, 0.0)
+
+        # Bird.update
+        self.vel += 0.5
+        self.y += self.vel
+        self.rect_y[:] = np.trunc(self.y)
+        self.immunity[self.immunity > 0] -= 1
+        self.shield_duration[self.shield] -= 1
+        self.shield &= self.shield_duration > 0
+        self.magnet_duration[self.magnet_duration > 0] -= 1
+
+        def can_hurt():
+            return (self.immunity == 0) & ~self.shield
+
+        # Падение вниз
+        fell = self.y > HEIGHT
+        self._hurt(fell & can_hurt())
+        self.y[fell] = HEIGHT - BIRD_H
+        self.vel[fell] = 0
+        self.rect_y[fell] = HEIGHT - BIRD_H
+
+        by = self.rect_y[:, None]
+
+        # Pipe.update и столкновения с трубами
+        self.pipe_x -= speed
+        px = self.pipe_x[None, :]
+        top = self.pipe_top
+        alive = self.pipe_alive
+        hit_top = _overlap(BIRD_X, by, BIRD_W, BIRD_H, px, 0, PIPE_W, top)
+        hit_bottom = _overlap(BIRD_X, by, BIRD_W, BIRD_H, px, top + PIPE_GAP, PIPE_W, HEIGHT)
+        hit = (alive & (hit_top | hit_bottom)).any(axis=1)
+        self._hurt(hit & can_hurt())
+        passed = alive & ~self.pipe_scored & (px + PIPE_W < BIRD_X)
+        self.pipe_scored |= passed
+        scored = passed.any(axis=1)
+        self.score += passed.sum(axis=1)
+        self._missions(scored, "pipes")
+        alive &= ~(px + PIPE_W < 0)
+
+        # Монеты: собранная монета исчезает, рамка всё равно уезжает влево
+        self.coin_x -= speed
+        cx = self.coin_x[None, :]
+        alive = self.coin_alive
+        got = alive & _overlap(BIRD_X, by, BIRD_W, BIRD_H, cx, self.coin_y, COIN_SIZE, COIN_SIZE)
+        alive &= ~got
+        self.coins += got.sum(axis=1)
+        self._missions(got.any(axis=1), "coins")
+        alive &= ~(cx + COIN_SIZE < 0)
+
+        # Бонусы
+        self.powerup_x -= speed
+        ux = self.powerup_x[None, :]
+        alive = self.powerup_alive
+        got = alive & _overlap(BIRD_X, by, BIRD_W, BIRD_H, ux, self.powerup_y, POWERUP_SIZE, POWERUP_SIZE)
+        shield = (got & self.powerup_shield).any(axis=1)
+        magnet = (got & ~self.powerup_shield).any(axis=1)
+        self.shield |= shield
+        self.shield_duration[shield] = self.shield_level[shield] * 300
+        self.magnet_duration[magnet] = self.magnet_level[magnet] * 300
+        alive &= ~got
+        alive &= ~(ux + POWERUP_SIZE < 0)
+
+        # Сердца
+        self.heart_x -= speed
+        hx = self.heart_x[None, :]
+        alive = self.heart_alive
+        got = alive & _overlap(BIRD_X, by, BIRD_W, BIRD_H, hx, self.heart_y, HEART_SIZE, HEART_SIZE)
+        count = got.sum(axis=1)
+        self.lives = np.minimum(self.lives + count, 5)
+        self.hearts_collected += count
+        alive &= ~got
+        self._missions(count > 0, "hearts")
+        alive &= ~(hx + HEART_SIZE < 0)
+
+        # Enemy.update: урон наносит только первый враг, дальше иммунитет
+        self.enemy_x -= self.enemy_speed
+        ex = self.enemy_x
+        alive = self.enemy_alive
+        hit = alive & _overlap(BIRD_X, by, BIRD_W, BIRD_H, ex, self.enemy_y, ENEMY_SIZE, ENEMY_SIZE)
+        hurt = hit.any(axis=1) & can_hurt()
+        if hurt.any():
+            order = np.where(hit, self.enemy_order[None, :], np.iinfo(np.int64).max)
+            first = order.argmin(axis=1)
+            rows = np.flatnonzero(hurt)
+            alive[rows, first[rows]] = False
+            self._hurt(hurt)
+        alive &= ~(ex + ENEMY_SIZE < 0)
+
+        done = self.lives <= 0
+        if done.any():
+            self.episodes[done] += 1
+            self.reset(done)
+        return done
+
+
+# Простой игрок для замеров: прыгать, когда птица ниже середины экрана
+def _policy_batch(game):
+    return game.y > HEIGHT // 2 + 20
+
+
+def _bench_scalar(games, ticks, difficulty):
+    random.seed(0)
+    states = [GameState(difficulty, RAINBOW_COLORS[0]) for _ in range(games)]
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for s in states:
+            s.step(JUMP if s.game_over or s.bird.y > HEIGHT // 2 + 20 else 0)
+    return games * ticks / (time.perf_counter() - start)
+
+
+def _bench_batch(games, ticks, difficulty):
+    game = BatchGame(games, difficulty, seed=0)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        game.step(_policy_batch(game))
+    return games * ticks / (time.perf_counter() - start)
+
+
+# Проверка против GameState: одиночная игра получает те же появления, что
+# игра 0 из BatchGame, и её погоду, а дальше физика, столкновения, урон и
+# награды за миссии должны совпасть на каждом тике до конца игры.
+
+# Погода игры 0: BatchGame уже сделал тик, Weather.update повторяет его шаг
+class _MirrorWeather(Weather):
+    def __init__(self, game):
+        self.game = game
+        self.rng = None
+        self.timer = 0
+        self.type = "clear"
+        self.wind = 0.0
+
+    def update(self):
+        self.timer = int(self.game.weather_timer[0]) - 1
+        self.type = "wind" if self.game.windy[0] else "clear"
+        Weather.update(self)
+
+
+# Вместо LevelStream: события этого тика, собранные из слотов BatchGame
+class _SpawnFeed:
+    def __init__(self, game):
+        self.game = game
+        self.gap = PIPE_GAP
+        self.seen = dict(game.spawned)
+
+    def restart(self):
+        pass
+
+    # Объекты уже сдвинулись на этом тике — x на момент появления на шаг правее
+    def advance(self):
+        g = self.game
+        kinds = (
+            (SPAWN_PIPE, "pipe", lambda k: (g.pipe_x[k] + g.speed, g.pipe_top[0, k], False)),
+            (SPAWN_COIN, "coin", lambda k: (g.coin_x[k] + g.speed, g.coin_y[0, k], 0)),
+            (SPAWN_POWERUP, "powerup", lambda k: (g.powerup_x[k] + g.speed, g.powerup_y[0, k], g.powerup_shield[0, k])),
+            (SPAWN_HEART, "heart", lambda k: (g.heart_x[k] + g.speed, g.heart_y[0, k], 0)),
+            (SPAWN_ENEMY, "enemy", lambda k: (g.enemy_x[0, k] + g.enemy_speed[0, k], g.enemy_y[0, k], g.enemy_speed[0, k])),
+        )
+        sizes = {"pipe": len(g.pipe_x), "coin": len(g.coin_x), "powerup": len(g.powerup_x),
+                 "heart": len(g.heart_x), "enemy": g.enemy_x.shape[1]}
+        events = []
+        for kind, name, slot in kinds:
+            for i in range(self.seen[name], g.spawned[name]):
+                x, y, extra = slot(i % sizes[name])
+                events.append((g.ticks, kind, int(x), int(y), extra.item() if hasattr(extra, "item") else extra))
+            self.seen[name] = g.spawned[name]
+        return events
+
+
+def _bird_state(state):
+    bird = state.bird
+    return (bird.y, bird.vel, bird.health, bird.lives, bird.immunity, bird.shield, bird.score, bird.coins,
+            tuple(m["completed"] for m in state.missions_manager.missions))
+
+
+def _batch_state(game):
+    fields = (game.y, game.vel, game.health, game.lives, game.immunity, game.shield, game.score, game.coins)
+    return (*(f[0].item() for f in fields), tuple(game.missions[0].tolist()))
+
+
+# Номер тика первого расхождения (AssertionError) или число сверенных тиков
+def check(ticks=5000, difficulty="Средняя", seed=0):
+    game = BatchGame(1, difficulty, seed=seed)
+    state = GameState(difficulty, RAINBOW_COLORS[0], seed=seed)
+    state.level = _SpawnFeed(game)
+    state.weather = _MirrorWeather(game)
+    for t in range(1, ticks + 1):
+        jump = _policy_batch(game)
+        done = game.step(jump)
+        state.step(JUMP if jump[0] else 0)
+        if done[0]:
+            assert state.game_over, f"тик {t}: BatchGame закончил игру, GameState — нет"
+            return t
+        expected, actual = _bird_state(state), _batch_state(game)
+        assert expected == actual, f"тик {t}: GameState {expected} != BatchGame {actual}"
+    return ticks
+
+
+# Замер: игровых тиков в секунду у скалярного цикла и у пакетного движка
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Пропускная способность BatchGame")
+    parser.add_argument("--games", type=int, nargs="+", default=[1, 64, 1024, 8192])
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--difficulty", default="Средняя", choices=list(DIFFICULTIES))
+    parser.add_argument("--check", type=int, metavar="SEEDS",
+                        help="вместо замера сверить с GameState игры с сидами 0..SEEDS-1")
+    args = parser.parse_args()
+
+    if args.check:
+        for seed in range(args.check):
+            ticks = check(args.ticks, args.difficulty, seed)
+            print(f"сид {seed}: {ticks} тиков совпали", file=sys.stderr)
+        sys.exit(0)
+
+    scalar = _bench_scalar(64, args.ticks, args.difficulty)
+    print(f"scalar GameState: {scalar:12,.0f} game-ticks/s")
+    for n in args.games:
+        rate = _bench_batch(n, args.ticks, args.difficulty)
+        print(f"batch N={n:<6}:   {rate:12,.0f} game-ticks/s  (x{rate / scalar:.1f})")
+    sys.exit(0)
@@ -0,0 +1,232 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import platform
+import subprocess
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import main
+from main import HEIGHT, DIFFICULTIES, RAINBOW_COLORS, GameState, JUMP
+
+# Сценарии замеров; игра создаётся с фиксированным сидом. Ключи, кроме
+# name/difficulty/weather, — атрибуты генератора уровня LevelStream
+# (интервалы появления), которые переопределяются после создания.
+SCENARIOS = [
+    *({"name": f"difficulty:{name}", "difficulty": name} for name in DIFFICULTIES),
+    {"name": "dense_pipes", "difficulty": "Средняя", "pipe_rate": 30},
+    {"name": "enemies_x10", "difficulty": "Средняя", "enemy_rate": 40},
+    {"name": "enemies_x100", "difficulty": "Средняя", "enemy_rate": 4},
+    {"name": "many_coins", "difficulty": "Средняя", "coin_rate": 5, "heart_rate": 30, "powerup_rate": 30},
+    {"name": "weather:fog", "difficulty": "Средняя", "weather": "fog"},
+    {"name": "weather:rain", "difficulty": "Средняя", "weather": "rain"},
+    {"name": "stress", "difficulty": "Сложная", "pipe_rate": 30, "enemy_rate": 4, "coin_rate": 5, "weather": "rain"},
+]
+
+
+# Скриптовый игрок: держаться у середины просвета ближайшей трубы,
+# после конца игры — сразу новая
+def scripted_action(state):
+    if state.game_over:
+        return JUMP
+    bird = state.bird
+    target = HEIGHT // 2
+    for pipe in state.pipes:
+        if pipe.x + pipe.width >= bird.x:
+            target = pipe.top + pipe.gap // 2
+            break
+    return JUMP if bird.y > target and bird.vel >= 0 else 0
+
+
+def make_state(scenario, seed):
+    state = GameState(scenario["difficulty"], RAINBOW_COLORS[2], seed=seed)
+    for key, value in scenario.items():
+        if key not in ("name", "difficulty", "weather"):
+            setattr(state.level, key, value)
+    return state
+
+
+def force_weather(state, scenario):
+    if "weather" in scenario:
+        state.weather.type = scenario["weather"]
+
+
+def entity_count(state):
+    return len(state.pipes) + len(state.coins) + len(state.powerups) + len(state.hearts) + len(state.enemies)
+
+
+def percentile(data, q):
+    data = sorted(data)
+    return data[min(len(data) - 1, int(q * len(data)))] if data else 0.0
+
+
+# Только симуляция: тиков в секунду
+def bench_sim(scenario, ticks, seed):
+    state = make_state(scenario, seed)
+    entities = 0
+    start = time.perf_counter()
+    for _ in range(ticks):
+        force_weather(state, scenario)
+        state.step(scripted_action(state))
+        entities += entity_count(state)
+    elapsed = time.perf_counter() - start
+    return {"sim_tps": ticks / elapsed, "avg_entities": entities / ticks, "score": state.bird.score}
+
+
+# Симуляция + отрисовка + flip: кадров в секунду и время кадра
+def bench_render(scenario, frames, seed, dirty=False):
+    state = make_state(scenario, seed)
+    renderer = main.DirtyRenderer() if dirty else None
+    times = []
+    start = time.perf_counter()
+    for _ in range(frames):
+        t = time.perf_counter()
+        force_weather(state, scenario)
+        state.step(scripted_action(state))
+        if renderer:
+            renderer.render(state)
+        else:
+            main.draw_game(state)
+            pygame.display.flip()
+        times.append((time.perf_counter() - t) * 1000)
+    elapsed = time.perf_counter() - start
+    return {
+        "render_fps": frames / elapsed,
+        "frame_ms_p50": percentile(times, 0.5),
+        "frame_ms_p95": percentile(times, 0.95),
+        "frame_ms_p99": percentile(times, 0.99),
+    }
+
+
+# Холодный запуск в отдельном процессе: импорт, init() и первый кадр.
+# Печатает отметки main.startup_times в JSON.
+STARTUP_SCRIPT = """
+import json, sys
+import main, pygame
+main.FONT_CACHE_FILE = sys.argv[1]
+main.init()
+main.sprites.bake_all()
+main.startup_mark("sprites")
+main.draw_game(main.GameState("Средняя", main.RAINBOW_COLORS[2], seed=0))
+pygame.display.flip()
+main.startup_mark("first_frame")
+print(json.dumps(main.startup_times))
+"""
+
+
+def run_startup(cache_file):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, cache_file], capture_output=True, text=True,
+                         check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    marks = json.loads(out.stdout.splitlines()[-1])
+    marks["process"] = (time.perf_counter() - start) * 1000
+    return marks
+
+
+# Время запуска, мс: первый прогон с пустым кэшем шрифта (cold_*),
+# остальные — медиана с заполненным
+def bench_startup(runs):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "fontcache.json")
+        cold = run_startup(cache_file)
+        warm = [run_startup(cache_file) for _ in range(runs)]
+    row = {f"cold_{k}": v for k, v in cold.items()}
+    for key in cold:
+        row[key] = percentile([marks[key] for marks in warm], 0.5)
+    return row
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(names=None, ticks=5000, frames=1000, seed=0, dirty=False, startup_runs=5):
+    startup = None
+    if startup_runs:
+        startup = bench_startup(startup_runs)
+        print(f"{'startup':<22} import {startup['import']:6.1f} ms  font {startup['font'] - startup['set_mode']:6.1f} ms"
+              f" (cold {startup['cold_font'] - startup['cold_set_mode']:6.1f})  first frame {startup['first_frame']:6.1f} ms"
+              f"  process {startup['process']:6.1f} ms", file=sys.stderr)
+    main.init()
+    main.sprites.bake_all()
+    results = []
+    for scenario in SCENARIOS:
+        if names and scenario["name"] not in names:
+            continue
+        row = {"scenario": scenario["name"], "seed": seed}
+        row.update(bench_sim(scenario, ticks, seed))
+        row.update(bench_render(scenario, frames, seed, dirty))
+        results.append(row)
+        print(f"{row['scenario']:<22} {row['sim_tps']:>10,.0f} ticks/s {row['render_fps']:>8,.0f} fps  "
+              f"p95 {row['frame_ms_p95']:6.2f} ms  entities {row['avg_entities']:6.1f}", file=sys.stderr)
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+        "ticks": ticks,
+        "frames": frames,
+        "dirty": dirty,
+        "startup": startup,
+        "results": results,
+    }
+
+
+# Сравнение с прошлым прогоном: отношение new / old по каждой метрике
+def compare(old, new):
+    if old.get("startup") and new.get("startup"):
+        parts = [f"{key} x{new['startup'][key] / old['startup'][key]:.2f}"
+                 for key in ("import", "first_frame", "process") if old["startup"].get(key)]
+        print(f"{'startup':<22} " + "  ".join(parts), file=sys.stderr)
+    old_rows = {row["scenario"]: row for row in old["results"]}
+    for row in new["results"]:
+        base = old_rows.get(row["scenario"])
+        if not base:
+            continue
+        parts = []
+        for key in ("sim_tps", "render_fps", "frame_ms_p95"):
+            if base.get(key):
+                parts.append(f"{key} x{row[key] / base[key]:.2f}")
+        print(f"{row['scenario']:<22} " + "  ".join(parts), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Замеры производительности Flappy Bird")
+    parser.add_argument("--scenario", action="append", help="запустить только эти сценарии")
+    parser.add_argument("--ticks", type=int, default=5000, help="тиков для замера симуляции")
+    parser.add_argument("--frames", type=int, default=1000, help="кадров для замера отрисовки")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dirty", action="store_true", help="мерить DirtyRenderer")
+    parser.add_argument("--startup-runs", type=int, default=5, help="замеров холодного запуска, 0 — без них")
+    parser.add_argument("--out", help="записать результаты в JSON-файл")
+    parser.add_argument("--compare", metavar="OLD.json", help="сравнить с прошлым прогоном")
+    parser.add_argument("--list", action="store_true", help="показать список сценариев")
+    args = parser.parse_args()
+
+    if args.list:
+        for scenario in SCENARIOS:
+            print(scenario["name"])
+        sys.exit(0)
+
+    report = run(args.scenario, args.ticks, args.frames, args.seed, args.dirty, args.startup_runs)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
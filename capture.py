@@ -0,0 +1,246 @@
+import os
+import sys
+import time
+import queue
+import shutil
+import threading
+import subprocess
+
+import numpy as np
+import pygame
+
+# Захват кадров для датасетов и видео. Кадр читается прямо из пикселей
+# поверхности через pygame.surfarray (BufferProxy поверхности, без копии),
+# уменьшается и переводится в оттенки серого уже на маленьком кадре, а на
+# диск уходит из фонового потока — отрисовка его не ждёт.
+
+CAPTURE_MAGIC = b"FLCAP001"
+HEADER_SIZE = 64
+GRAY_WEIGHTS = (77, 150, 29)  # ITU-R 601 в 1/256, сумма 256
+
+
+# Кадр экрана как массив (H, W) или (H, W, 3) uint8. size — сторона
+# квадратного кадра (84 как в Atari-средах) или None для полного размера.
+class FrameSampler:
+    def __init__(self, surface, size=None, gray=False):
+        self.surface = surface
+        self.gray = gray
+        self.shifts = surface.get_shifts()[:3]
+        w, h = surface.get_size()
+        if size:
+            # Ближайший пиксель: индексы строк и столбцов считаются один раз
+            self.xs = np.linspace(0, w - 1, size).round().astype(np.intp)[:, None]
+            self.ys = np.linspace(0, h - 1, size).round().astype(np.intp)[None, :]
+            w = h = size
+        else:
+            self.xs = self.ys = None
+        self.shape = (h, w) if gray else (h, w, 3)
+
+    def grab(self):
+        # Представление (W, H) поверх памяти поверхности, по uint32 на пиксель;
+        # пока оно живо, поверхность заблокирована, поэтому отпускаем его сразу.
+        # Уменьшение — выборка по индексам, так что каналы дальше разбираются
+        # уже на маленьком кадре.
+        view = pygame.surfarray.pixels2d(self.surface)
+        try:
+            pixels = view[self.xs, self.ys].T if self.xs is not None else view.T
+            if self.gray:
+                gray = sum((pixels >> shift & 255) * k for shift, k in zip(self.shifts, GRAY_WEIGHTS))
+                return (gray >> 8).astype(np.uint8)
+            frame = np.empty(self.shape, dtype=np.uint8)
+            for c, shift in enumerate(self.shifts):
+                frame[..., c] = pixels >> shift
+            return frame
+        finally:
+            del view
+
+
+# k последних кадров подряд. Каждый кадр пишется дважды (в i и i + k),
+# так что окно из k кадров — всегда непрерывный срез, без копирования.
+class FrameStack:
+    def __init__(self, k, shape):
+        self.k = k
+        self.buf = np.zeros((2 * k, *shape), dtype=np.uint8)
+        self.i = 0
+
+    def push(self, frame):
+        self.buf[self.i] = frame
+        self.buf[self.i + self.k] = frame
+        self.i = (self.i + 1) % self.k
+        return self.view()
+
+    # От старого кадра к новому
+    def view(self):
+        return self.buf[self.i:self.i + self.k]
+
+
+# Кольцо кадров в файле через np.memmap: заголовок (магия, ёмкость,
+# число записанных кадров, форма кадра), дальше capacity кадров подряд.
+class MemmapRing:
+    def __init__(self, path, capacity, shape):
+        self.capacity = capacity
+        self.shape = shape
+        header = np.zeros(HEADER_SIZE // 8, dtype=np.int64)
+        header[0] = int.from_bytes(CAPTURE_MAGIC, "little")
+        header[1] = capacity
+        header[2] = 0
+        header[3] = len(shape)
+        header[4:4 + len(shape)] = shape
+        with open(path, "wb") as f:
+            f.write(header.tobytes())
+            f.truncate(HEADER_SIZE + capacity * int(np.prod(shape)))
+        self.header = np.memmap(path, dtype=np.int64, mode="r+", shape=(HEADER_SIZE // 8,))
+        self.frames = np.memmap(path, dtype=np.uint8, mode="r+", offset=HEADER_SIZE, shape=(capacity, *shape))
+        self.count = 0
+
+    def write(self, frame):
+        self.frames[self.count % self.capacity] = frame
+        self.count += 1
+        self.header[2] = self.count
+
+    def close(self):
+        self.frames.flush()
+        self.header.flush()
+
+
+# Чтение кольца: (кадры от старого к новому, всего записано)
+def read_ring(path):
+    header = np.fromfile(path, dtype=np.int64, count=HEADER_SIZE // 8)
+    if header[0] != int.from_bytes(CAPTURE_MAGIC, "little"):
+        raise ValueError(f"{path}: не файл захвата")
+    capacity, count, ndim = int(header[1]), int(header[2]), int(header[3])
+    shape = tuple(int(v) for v in header[4:4 + ndim])
+    frames = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER_SIZE, shape=(capacity, *shape))
+    if count <= capacity:
+        return frames[:count], count
+    start = count % capacity
+    return np.concatenate([frames[start:], frames[:start]]), count
+
+
+# Видео через ffmpeg: кадры сырыми байтами в stdin
+class VideoSink:
+    def __init__(self, path, shape, fps=60):
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            raise RuntimeError("для записи видео нужен ffmpeg в PATH")
+        h, w = shape[:2]
+        pix_fmt = "gray" if len(shape) == 2 else "rgb24"
+        self.proc = subprocess.Popen(
+            [ffmpeg, "-loglevel", "error", "-y", "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{w}x{h}",
+             "-r", str(fps), "-i", "-", "-c:v", "libx264", "-pix_fmt", "yuv420p", path],
+            stdin=subprocess.PIPE,
+        )
+        self.count = 0
+
+    def write(self, frame):
+        self.proc.stdin.write(frame.tobytes())
+        self.count += 1
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov")
+
+
+def open_sink(path, shape, capacity=36000, fps=60):
+    if path.lower().endswith(VIDEO_EXTENSIONS):
+        return VideoSink(path, shape, fps)
+    return MemmapRing(path, capacity, shape)
+
+
+# Захват: кадр берётся в потоке отрисовки, пишется в фоновом. Очередь
+# ограничена: если диск не успевает, кадры отбрасываются (dropped), а не
+# тормозят игру. Кольцо по умолчанию — 10 минут при 60 кадрах/с. Ошибка
+# записи останавливает фоновый поток и поднимается из close().
+class Capture:
+    def __init__(self, surface, path, size=84, gray=True, stack=4, capacity=36000, fps=60, queue_size=256):
+        self.sampler = FrameSampler(surface, size, gray)
+        self.stack = FrameStack(stack, self.sampler.shape) if stack > 1 else None
+        self.sink = open_sink(path, self.sampler.shape, capacity, fps)
+        self.queue = queue.Queue(queue_size)
+        self.frames = 0
+        self.dropped = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="capture", daemon=True)
+        self.thread.start()
+
+    # Снять текущий кадр; возвращает стопку последних кадров (или сам кадр)
+    def grab(self):
+        frame = self.sampler.grab()
+        self.frames += 1
+        try:
+            self.queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+        return self.stack.push(frame) if self.stack else frame
+
+    def _run(self):
+        try:
+            while True:
+                frame = self.queue.get()
+                if frame is None:
+                    return
+                self.sink.write(frame)
+        except BaseException as e:
+            self.error = e
+
+    def close(self):
+        # Если поток уже умер с полной очередью, put() ждал бы вечно
+        while self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+        try:
+            self.sink.close()
+        finally:
+            if self.error is not None:
+                raise RuntimeError(f"запись кадров прервалась: {self.error}") from self.error
+
+
+# Безголовый прогон: автопилот играет, каждый кадр рисуется и снимается
+def run(path, frames, size, gray, stack, seed, difficulty):
+    import main
+
+    main.init()
+    main.sprites.bake_all()
+    state = main.GameState(difficulty, main.RAINBOW_COLORS[2], seed=seed)
+    pilot = main.Autopilot()
+    capture = Capture(main.screen, path, size, gray, stack, capacity=frames) if path else None
+    start = time.perf_counter()
+    for _ in range(frames):
+        state.step(pilot.decide(state))
+        main.draw_game(state)
+        pygame.display.flip()
+        if capture:
+            capture.grab()
+    elapsed = time.perf_counter() - start
+    if capture:
+        capture.close()
+    return frames / elapsed, capture
+
+
+if __name__ == "__main__":
+    import argparse
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    parser = argparse.ArgumentParser(description="Запись кадров игры для обучения и видео")
+    parser.add_argument("out", nargs="?", help="файл кольца кадров или видео (.mp4/.mkv/...); без него — только замер")
+    parser.add_argument("--frames", type=int, default=3000)
+    parser.add_argument("--size", type=int, default=84, help="сторона кадра, 0 — полный размер экрана")
+    parser.add_argument("--color", action="store_true", help="цветные кадры вместо оттенков серого")
+    parser.add_argument("--stack", type=int, default=4, help="кадров в стопке наблюдения")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--difficulty", default="Средняя")
+    args = parser.parse_args()
+
+    fps, capture = run(args.out, args.frames, args.size or None, not args.color, args.stack, args.seed, args.difficulty)
+    print(f"{fps:,.0f} кадров/с", file=sys.stderr)
+    if capture:
+        print(f"записано {capture.sink.count}, отброшено {capture.dropped}", file=sys.stderr)
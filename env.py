@@ -0,0 +1,235 @@
+import os
+import random
+import multiprocessing as mp
+
+import numpy as np
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from main import WIDTH, HEIGHT, DIFFICULTIES, RAINBOW_COLORS, GameState, JUMP
+
+# Поля вектора наблюдения (всё нормировано примерно к [-1, 1])
+OBS_FIELDS = [
+    "bird_y", "bird_vel", "health", "lives", "immunity", "shield", "magnet",
+    "pipe1_dx", "pipe1_top", "pipe1_bottom",
+    "pipe2_dx", "pipe2_top", "pipe2_bottom",
+    "enemy1_dx", "enemy1_dy", "enemy1_speed",
+    "enemy2_dx", "enemy2_dy", "enemy2_speed",
+    "coin_dx", "coin_dy",
+    "powerup_dx", "powerup_dy", "powerup_shield",
+]
+OBS_SIZE = len(OBS_FIELDS)
+
+# Награды
+REWARD_ALIVE = 0.01
+REWARD_PIPE = 1.0
+REWARD_COIN = 0.1
+REWARD_HIT = -0.5
+REWARD_DEATH = -1.0
+
+
+# Заполняет out (float32, OBS_SIZE) по состоянию игры; пустые слоты — "далеко"
+def observe(state, out):
+    bird = state.bird
+    out[:] = 0
+    out[0] = bird.y / HEIGHT
+    out[1] = bird.vel / 10
+    out[2] = bird.health / 100
+    out[3] = bird.lives / 5
+    out[4] = bird.immunity / 120
+    out[5] = bird.shield_duration / 300 if bird.shield else 0
+    out[6] = bird.magnet_duration / 300
+
+    i = 7
+    ahead = [p for p in state.pipes if p.x + p.width >= bird.x][:2]
+    for n in range(2):
+        if n < len(ahead):
+            p = ahead[n]
+            out[i:i + 3] = ((p.x - bird.x) / WIDTH, p.top / HEIGHT, p.bottom / HEIGHT)
+        else:
+            out[i:i + 3] = (1, 0, 1)
+        i += 3
+
+    ahead = sorted((e for e in state.enemies if e.rect.right >= bird.x), key=lambda e: e.rect.x)[:2]
+    for n in range(2):
+        if n < len(ahead):
+            e = ahead[n].rect
+            out[i:i + 3] = ((e.x - bird.x) / WIDTH, (e.centery - bird.rect.centery) / HEIGHT, ahead[n].speed / 4)
+        else:
+            out[i:i + 3] = (1, 0, 0)
+        i += 3
+
+    coin = next((c for c in state.coins if not c.collected and c.rect.right >= bird.x), None)
+    if coin:
+        out[i:i + 2] = ((coin.rect.x - bird.x) / WIDTH, (coin.rect.centery - bird.rect.centery) / HEIGHT)
+    else:
+        out[i] = 1
+    i += 2
+
+    pu = next((p for p in state.powerups if p.rect.right >= bird.x), None)
+    if pu:
+        out[i:i + 3] = ((pu.rect.x - bird.x) / WIDTH, (pu.rect.centery - bird.rect.centery) / HEIGHT, pu.kind == "shield")
+    else:
+        out[i] = 1
+    return out
+
+
+# Одна игра в стиле Gym: reset(seed) -> obs, step(action) -> obs, reward, done, info.
+# action: 0 — ничего, 1 — прыжок.
+class FlappyEnv:
+    def __init__(self, difficulty="Средняя", max_ticks=None, obs_buffer=None):
+        self.difficulty = difficulty
+        self.max_ticks = max_ticks
+        self.obs = obs_buffer if obs_buffer is not None else np.zeros(OBS_SIZE, dtype=np.float32)
+        self.state = None
+
+    # Без seed сид новой игры берётся из модуля random
+    def reset(self, seed=None):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.state = GameState(self.difficulty, RAINBOW_COLORS[2], seed=seed)
+        return observe(self.state, self.obs)
+
+    def step(self, action):
+        state = self.state
+        bird = state.bird
+        score, coins, health, lives = bird.score, bird.coins, bird.health, bird.lives
+        state.step(JUMP if action else 0)
+
+        reward = REWARD_ALIVE
+        reward += (bird.score - score) * REWARD_PIPE
+        reward += max(bird.coins - coins, 0) * REWARD_COIN
+        if bird.health < health or bird.lives < lives:
+            reward += REWARD_HIT
+        done = state.game_over or (self.max_ticks is not None and state.ticks >= self.max_ticks)
+        if state.game_over:
+            reward += REWARD_DEATH
+        info = {"score": bird.score, "coins": bird.coins, "lives": bird.lives, "ticks": state.ticks}
+        return observe(state, self.obs), reward, done, info
+
+
+# Поля info, которые векторная среда отдаёт через общую память
+INFO_FIELDS = ["score", "coins", "lives", "ticks"]
+
+
+def _worker(conn, lo, hi, difficulty, max_ticks, obs_raw, reward_raw, done_raw, info_raw, action_raw):
+    k = len(action_raw)
+    obs = np.frombuffer(obs_raw, dtype=np.float32).reshape(k, OBS_SIZE)
+    rewards = np.frombuffer(reward_raw, dtype=np.float32)
+    dones = np.frombuffer(done_raw, dtype=np.uint8)
+    infos = np.frombuffer(info_raw, dtype=np.int64).reshape(k, len(INFO_FIELDS))
+    actions = np.frombuffer(action_raw, dtype=np.uint8)
+    envs = [FlappyEnv(difficulty, max_ticks, obs_buffer=obs[i]) for i in range(lo, hi)]
+    # Сиды следующих игр — из своего генератора у каждой среды: после
+    # reset(seed) весь поток игр воспроизводим, без seed — из энтропии ОС
+    # (общий random после fork у всех процессов одинаковый)
+    rngs = [random.Random() for _ in envs]
+
+    while True:
+        cmd, arg = conn.recv()
+        if cmd == "step":
+            for i, env in enumerate(envs, lo):
+                _, rewards[i], done, info = env.step(actions[i])
+                dones[i] = done
+                infos[i] = [info[f] for f in INFO_FIELDS]
+                # Автосброс: в obs уже первое наблюдение новой игры
+                if done:
+                    env.reset(rngs[i - lo].randrange(2 ** 32))
+        elif cmd == "reset":
+            for i, env in enumerate(envs, lo):
+                rng = rngs[i - lo] = random.Random(None if arg is None else arg + i)
+                env.reset(arg + i if arg is not None else rng.randrange(2 ** 32))
+                rewards[i] = 0
+                dones[i] = 0
+        elif cmd == "close":
+            conn.close()
+            return
+        conn.send(None)
+
+
+# K сред в нескольких процессах. Наблюдения, награды, флаги конца и info
+# лежат в общей памяти (RawArray); по каналу идут только короткие команды.
+class VectorEnv:
+    def __init__(self, k, difficulty="Средняя", workers=None, max_ticks=None):
+        self.k = k
+        workers = min(workers or os.cpu_count() or 1, k)
+        self._obs_raw = mp.RawArray("b", k * OBS_SIZE * 4)
+        self._reward_raw = mp.RawArray("b", k * 4)
+        self._done_raw = mp.RawArray("b", k)
+        self._info_raw = mp.RawArray("b", k * len(INFO_FIELDS) * 8)
+        self._action_raw = mp.RawArray("b", k)
+        self.obs = np.frombuffer(self._obs_raw, dtype=np.float32).reshape(k, OBS_SIZE)
+        self.rewards = np.frombuffer(self._reward_raw, dtype=np.float32)
+        self.dones = np.frombuffer(self._done_raw, dtype=np.uint8)
+        self.infos = np.frombuffer(self._info_raw, dtype=np.int64).reshape(k, len(INFO_FIELDS))
+        self.actions = np.frombuffer(self._action_raw, dtype=np.uint8)
+
+        self._conns = []
+        self._procs = []
+        bounds = np.linspace(0, k, workers + 1).astype(int)
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            parent, child = mp.Pipe()
+            proc = mp.Process(
+                target=_worker,
+                args=(child, lo, hi, difficulty, max_ticks, self._obs_raw, self._reward_raw,
+                      self._done_raw, self._info_raw, self._action_raw),
+                daemon=True,
+            )
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    def _call(self, cmd, arg=None):
+        for conn in self._conns:
+            conn.send((cmd, arg))
+        for conn in self._conns:
+            conn.recv()
+
+    # Возвращаются представления общей памяти; копируйте, если нужно хранить
+    def reset(self, seed=None):
+        self._call("reset", seed)
+        return self.obs
+
+    def step(self, actions):
+        self.actions[:] = actions
+        self._call("step")
+        return self.obs, self.rewards, self.dones.astype(bool), self.infos
+
+    def close(self):
+        for conn in self._conns:
+            conn.send(("close", None))
+        for proc in self._procs:
+            proc.join()
+        self._conns = []
+        self._procs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Прогон VectorEnv со случайными действиями")
+    parser.add_argument("--envs", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--difficulty", default="Средняя", choices=list(DIFFICULTIES))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with VectorEnv(args.envs, args.difficulty, args.workers) as venv:
+        venv.reset(seed=0)
+        start = time.perf_counter()
+        episodes = 0
+        for _ in range(args.steps):
+            _, _, dones, _ = venv.step(rng.random(args.envs) < 0.07)
+            episodes += int(dones.sum())
+        elapsed = time.perf_counter() - start
+    print(f"{args.envs * args.steps / elapsed:,.0f} env-steps/s, {episodes} episodes")
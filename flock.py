@@ -0,0 +1,80 @@
+import sys
+import time
+import random
+
+import pygame
+
+import main
+from main import HEIGHT, DIFFICULTIES, Flock, JUMP
+
+# Стая скриптовых птиц в одном мире: у каждой свой сдвиг цели в просвете
+# и своя вероятность прыжка, так что птицы выбывают в разное время.
+# Без --watch — безголовый замер, с --watch — гонка в окне.
+
+
+class FlockPlayer:
+    def __init__(self, n, seed):
+        rng = random.Random(seed)
+        self.offsets = [rng.randint(-50, 50) for _ in range(n)]
+        self.chance = [rng.uniform(0.2, 0.9) for _ in range(n)]
+        self.rng = rng
+        self.actions = [0] * n
+
+    def __call__(self, flock):
+        target = HEIGHT // 2
+        x = flock.birds[0].x
+        for pipe in flock.pipes:
+            if pipe.x + pipe.width >= x:
+                target = pipe.top + pipe.gap // 2
+                break
+        actions = self.actions
+        birds = flock.birds
+        random = self.rng.random
+        for i in flock.live:
+            bird = birds[i]
+            actions[i] = JUMP if bird.y > target + self.offsets[i] and bird.vel >= 0 and random() < self.chance[i] else 0
+        return actions
+
+
+def run(n, difficulty, seed, max_ticks, watch=False, fps=60):
+    flock = Flock(difficulty, n, seed)
+    player = FlockPlayer(n, seed)
+    if watch:
+        main.init()
+        main.sprites.bake_all()
+    start = time.perf_counter()
+    while flock.ticks < max_ticks:
+        if watch:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return flock, time.perf_counter() - start
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                    flock.paused = not flock.paused
+            main.draw_flock(flock)
+            pygame.display.flip()
+            main.clock.tick(fps)
+        elif flock.game_over:
+            break
+        flock.step(player(flock))
+    return flock, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Много птиц в одном мире")
+    parser.add_argument("--birds", type=int, default=300)
+    parser.add_argument("--difficulty", default="Средняя", choices=list(DIFFICULTIES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=10000)
+    parser.add_argument("--watch", action="store_true", help="показывать гонку в окне (P — пауза)")
+    parser.add_argument("--fps", type=int, default=60)
+    args = parser.parse_args()
+
+    flock, elapsed = run(args.birds, args.difficulty, args.seed, args.max_ticks, args.watch, args.fps)
+    results = flock.results()
+    scores = sorted((r[0] for r in results), reverse=True)
+    print(f"{flock.ticks} тиков за {elapsed:.2f} с: {flock.ticks / elapsed:,.0f} тиков/с, "
+          f"{flock.ticks * args.birds / elapsed:,.0f} птице-тиков/с", file=sys.stderr)
+    print(f"живых {len(flock.live)}/{args.birds}, лучшие очки {scores[:5]}, медиана {scores[len(scores) // 2]}",
+          file=sys.stderr)
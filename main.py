@@ -1,14 +1,37 @@
+import time
+
+# Отметки времени запуска, мс от начала импорта main (см. bench.py)
+STARTUP_START = time.perf_counter()
+startup_times = {}
+
+def startup_mark(name):
+    startup_times[name] = (time.perf_counter() - STARTUP_START) * 1000
+
 import pygame
 import random
 import sys
 import json
 import os
+import struct
+import hashlib
+import sqlite3
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
+from itertools import repeat
+from operator import attrgetter
 
-pygame.init()
 WIDTH, HEIGHT = 400, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-clock = pygame.time.Clock()
-FONT = pygame.font.SysFont("Arial", 20)
+# Окно, часы и шрифт создаёт init(); до него модуль импортируется без
+# окна и без pygame.init() — симуляции (GameState, env.py, sweep.py) они не нужны
+screen = None
+clock = None
+FONT = None
+FONT_NAME = "Arial"
+FONT_SIZE = 20
+FONT_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fontcache.json")
 
 # Цвета радуги
 RAINBOW_COLORS = [
@@ -29,36 +52,132 @@ SHIELD_COLOR = (135, 206, 250)
 MAGNET_COLOR = (255, 20, 147)
 HEART_COLOR = (255, 0, 0)
 ENEMY_COLOR = (139, 0, 0)
+BIRD_IMMUNITY_COLOR = (255, 100, 100)
+BIRD_RAGE_COLOR = (255, 50, 50)
+MAGNET_SIZE = 101  # круг радиусом 50 вокруг птицы
+PIPE_WIDTH = 70
+PIPE_GAP = 150
+PIPE_MARGIN_TOP = 60     # просвет не ближе к верху экрана
+PIPE_MARGIN_BOTTOM = 70  # и к низу
 BG_COLORS = [(135, 206, 250), (250, 250, 210), (255, 140, 0), (25, 25, 112)]
 SAVE_FILE = "savegame.json"
+AUTOSAVE_TICKS = 300  # автосохранение раз в 5 секунд игры
+LEADERBOARD_FILE = "leaderboard.db"
+LEADERBOARD_TOP = 10
+# Скорости, таймеры и интервалы появления заданы в тиках, а не в секундах,
+# поэтому --tick-rate меняет темп игры целиком (120 — вдвое быстрее), но не
+# сам забег: сид, повторы и боты дают те же тики при любой частоте
+TICK_RATE = 60     # тиков симуляции в секунду
+MAX_CATCHUP = 5    # максимум тиков за один кадр
 DIFFICULTIES = {
     "Лёгкая": {"pipe_speed": 3, "enemy_rate": 600},
     "Средняя": {"pipe_speed": 4, "enemy_rate": 400},
     "Сложная": {"pipe_speed": 5, "enemy_rate": 250},
 }
 
+# Путь к системному шрифту. SysFont на Linux ищет шрифт через fc-list,
+# а это сотни миллисекунд на каждый запуск, поэтому найденный путь хранится
+# на диске. Пустая строка — шрифта нет, берётся встроенный шрифт pygame.
+def font_path(name):
+    try:
+        with open(FONT_CACHE_FILE, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    path = cache.get(name)
+    if path is None or path and not os.path.exists(path):
+        path = cache[name] = pygame.font.match_font(name) or ""
+        try:
+            with open(FONT_CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False)
+        except OSError:
+            pass
+    return path or None
+
+# Запуск графики: только нужные подсистемы pygame (pygame.init() поднимает
+# ещё звук и джойстики), окно, часы и шрифт. Повторный вызов ничего не делает.
+def init(size=(WIDTH, HEIGHT)):
+    global screen, clock, FONT
+    if screen is not None:
+        return screen
+    pygame.display.init()
+    pygame.font.init()
+    startup_mark("pygame_init")
+    screen = pygame.display.set_mode(size)
+    clock = pygame.time.Clock()
+    startup_mark("set_mode")
+    FONT = pygame.font.Font(font_path(FONT_NAME), FONT_SIZE)
+    startup_mark("font")
+    return screen
+
+# Кэш отрисованного текста: LRU по (текст, цвет, шрифт) со счётчиками попаданий.
+# В режиме glyphs меняющиеся значения собираются из готовых символов.
+class TextCache:
+    def __init__(self, max_size=256, glyphs=False):
+        self.max_size = max_size
+        self.glyphs = glyphs
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, color=(0, 0, 0), font=None):
+        font = font or FONT
+        key = (text, color, font)
+        img = self.surfaces.get(key)
+        if img is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return img
+        self.misses += 1
+        img = font.render(text, True, color)
+        self.surfaces[key] = img
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return img
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.surfaces),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+text_cache = TextCache()
+
 # Функция для отрисовки текста
 def draw_text(text, x, y, color=(0, 0, 0)):
-    img = FONT.render(text, True, color)
-    screen.blit(img, (x, y))
+    return screen.blit(text_cache.render(text, color), (x, y))
+
+# Текст вида "подпись + значение": подпись рисуется целиком,
+# значение — целиком или по символам (режим glyphs)
+def draw_value(label, value, x, y, color=(0, 0, 0)):
+    value = str(value)
+    if not text_cache.glyphs:
+        return draw_text(label + value, x, y, color)
+    rect = screen.blit(text_cache.render(label, color), (x, y))
+    x = rect.right
+    for ch in value:
+        img = text_cache.render(ch, color)
+        screen.blit(img, (x, y))
+        x += img.get_width()
+    rect.width = x - rect.x
+    return rect
 
 # Функция для отрисовки прогресса миссий
 def draw_mission_progress(missions_manager):
     x = WIDTH - 230
     y = 30
-    draw_text("Миссии:", x, y - 25)
-    for m in missions_manager.missions:
-        if not m["completed"]:
-            if "монет" in m["description"]:
-                current = missions_manager.coins_collected
-            elif "труб" in m["description"]:
-                current = missions_manager.pipes_passed
-            elif "сердечка" in m["description"]:
-                current = missions_manager.hearts_collected
-            else:
-                current = 0
-            draw_text(f"{m['description']}: {current}/{m['target']}", x, y)
-            y += 25
+    rects = [draw_text("Миссии:", x, y - 25)]
+    for label, value in missions_manager.progress():
+        rects.append(draw_value(label, value, x, y))
+        y += 25
+    return rects
             
 # Функция для отрисовки шкалы здоровья
 def draw_health_bar(x, y, health, max_health=100, width=100, height=10):
@@ -66,6 +185,7 @@ def draw_health_bar(x, y, health, max_health=100, width=100, height=10):
     pygame.draw.rect(screen, (255, 0, 0), (x, y, width, height))  # фон красный
     green_width = int((health / max_health) * width)
     pygame.draw.rect(screen, (0, 255, 0), (x, y, green_width, height))  # зелёная часть
+    return pygame.Rect(x - 2, y - 2, width + 4, height + 4)
 
 # Главное меню: ввод имени и выбор сложности
 def main_menu():
@@ -73,6 +193,7 @@ def main_menu():
     selected_difficulty = 1
     difficulties = list(DIFFICULTIES.keys())
     active_input = True
+    autopilot = False
 
     while True:
         screen.fill((255, 255, 255))
@@ -85,6 +206,7 @@ def main_menu():
             color = (0, 0, 0) if i != selected_difficulty else (255, 0, 0)
             draw_text(f"{i+1}. {diff}", 60, 160 + i * 30, color)
 
+        draw_text(f"TAB — автопилот: {'вкл' if autopilot else 'выкл'}", 40, 250)
         draw_text("Нажмите ENTER чтобы начать", 40, 280)
 
         for event in pygame.event.get():
@@ -95,9 +217,11 @@ def main_menu():
                 if active_input:
                     if event.key == pygame.K_RETURN:
                         if input_name.strip():
-                            return input_name, difficulties[selected_difficulty]
+                            return input_name, difficulties[selected_difficulty], autopilot
                     elif event.key == pygame.K_BACKSPACE:
                         input_name = input_name[:-1]
+                    elif event.key == pygame.K_TAB:
+                        autopilot = not autopilot
                     elif len(input_name) < 12 and event.unicode.isprintable():
                         input_name += event.unicode
                 if pygame.K_1 <= event.key <= pygame.K_3:
@@ -130,12 +254,58 @@ def choose_color():
         pygame.display.flip()
         clock.tick(30)
 
+# Спрайты: каждый вид объекта рисуется в поверхность один раз
+# (с convert/convert_alpha под формат экрана), дальше только blit
+class Sprites:
+    def __init__(self):
+        self.surfaces = {}
+
+    # shape: "rect" | "ellipse" | "circle"; width > 0 — только контур
+    def get(self, shape, w, h, color, width=0):
+        key = (shape, w, h, color, width)
+        img = self.surfaces.get(key)
+        if img is None:
+            img = self.surfaces[key] = self._bake(shape, w, h, color, width)
+        return img
+
+    def _bake(self, shape, w, h, color, width):
+        converted = pygame.display.get_surface() is not None
+        if shape == "rect" and width == 0:
+            img = pygame.Surface((w, h))
+            img.fill(color)
+            return img.convert() if converted else img
+        img = pygame.Surface((w, h), pygame.SRCALPHA)
+        if shape == "rect":
+            pygame.draw.rect(img, color, (0, 0, w, h), width)
+        elif shape == "ellipse":
+            pygame.draw.ellipse(img, color, (0, 0, w, h), width)
+        else:
+            pygame.draw.circle(img, color, (w // 2, h // 2), w // 2, width)
+        return img.convert_alpha() if converted else img
+
+    # Заранее запечь все варианты, чтобы не было подвисаний в игре
+    def bake_all(self):
+        for color in RAINBOW_COLORS + [BIRD_IMMUNITY_COLOR, BIRD_RAGE_COLOR]:
+            self.get("rect", 40, 30, color)
+        self.get("rect", 50, 40, SHIELD_COLOR, 2)
+        self.get("circle", MAGNET_SIZE, MAGNET_SIZE, MAGNET_COLOR, 2)
+        for color in (PIPE_COLOR, PIPE_DANGER_COLOR):
+            self.get("rect", 70, HEIGHT, color)
+        self.get("ellipse", 25, 25, COIN_COLOR)
+        self.get("rect", 25, 25, SHIELD_COLOR)
+        self.get("rect", 25, 25, MAGNET_COLOR)
+        self.get("ellipse", 30, 30, HEART_COLOR)
+        self.get("rect", 40, 40, ENEMY_COLOR)
+
+sprites = Sprites()
+
 # Класс птицы
 class Bird:
     def __init__(self, color):
         self.color = color
         self.x = 60
         self.y = HEIGHT // 2
+        self.prev_y = self.y
         self.vel = 0
         self.gravity = 0.5
         self.jump_power_base = -9
@@ -155,6 +325,7 @@ class Bird:
         self.magnet_duration = 0
 
     def update(self):
+        self.prev_y = self.y
         self.vel += self.gravity
         self.y += self.vel
         self.rect.y = int(self.y)
@@ -179,114 +350,491 @@ class Bird:
     def jump(self):
         self.vel = self.jump_power
 
-    def draw(self):
-        color = (255, 100, 100) if self.immunity > 0 else self.color
+    # Урон: -25 здоровья, иммунитет, потеря жизни; True — жизни кончились
+    def hurt(self):
+        self.health -= 25
+        self.immunity = 120
+        if self.health <= 0:
+            self.lives -= 1
+            self.health = 100
+            self.immunity = 120
+        return self.lives <= 0
+
+    # Добавляет в out пары (спрайт, позиция) для screen.blits;
+    # dy — смещение для интерполяции между тиками
+    def blit_items(self, out, dy=0):
+        color = BIRD_IMMUNITY_COLOR if self.immunity > 0 else self.color
         if self.rage_mode:
-            color = (255, 50, 50)
-        pygame.draw.rect(screen, color, self.rect)
+            color = BIRD_RAGE_COLOR
+        rect = self.rect.move(0, dy) if dy else self.rect
+        out.append((sprites.get("rect", self.width, self.height, color), rect))
+        return self.effect_items(out, rect)
+
+    # Щит и магнит вокруг rect
+    def effect_items(self, out, rect):
         if self.shield:
-            pygame.draw.rect(screen, SHIELD_COLOR, self.rect.inflate(10, 10), 2)
+            frame = rect.inflate(10, 10)
+            out.append((sprites.get("rect", frame.w, frame.h, SHIELD_COLOR, 2), frame))
         if self.magnet_duration > 0:
-            pygame.draw.circle(screen, MAGNET_COLOR, self.rect.center, 50, 2)
+            r = MAGNET_SIZE // 2
+            out.append((sprites.get("circle", MAGNET_SIZE, MAGNET_SIZE, MAGNET_COLOR, 2),
+                        (rect.centerx - r, rect.centery - r)))
+        return out
+
+    def draw(self, dy=0):
+        return screen.blits(self.blit_items([], dy))
 
 
+# Объекты мира используют __slots__ и reset(): EntityList переиспользует
+# удалённые экземпляры вместе с их Rect вместо создания новых
 class Pipe:
-    def __init__(self, x):
+    __slots__ = ("x", "width", "gap", "top", "bottom", "rect_top", "rect_bottom", "scored", "danger", "alive", "seq")
+
+    # Положение просвета и опасность задаёт генератор уровня (LevelStream)
+    def __init__(self, x, top, danger, gap=PIPE_GAP):
+        self.width = PIPE_WIDTH
+        self.rect_top = pygame.Rect(0, 0, 0, 0)
+        self.rect_bottom = pygame.Rect(0, 0, 0, 0)
+        self.reset(x, top, danger, gap)
+
+    def reset(self, x, top, danger, gap=PIPE_GAP):
         self.x = x
-        self.width = 70
-        self.gap = 150
-        self.top = random.randint(60, HEIGHT - 220)
+        self.gap = gap
+        self.top = top
         self.bottom = self.top + self.gap
-        self.rect_top = pygame.Rect(self.x, 0, self.width, self.top)
-        self.rect_bottom = pygame.Rect(self.x, self.bottom, self.width, HEIGHT)
+        self.rect_top.update(self.x, 0, self.width, self.top)
+        self.rect_bottom.update(self.x, self.bottom, self.width, HEIGHT)
         self.scored = False
-        self.danger = random.random() < 0.2
+        self.danger = danger
+        self.alive = True
+
+    # Пустой экземпляр для восстановления из снимка
+    @classmethod
+    def blank(cls):
+        return cls(0, 0, False)
+
+    # Упаковка в PACK целых для снимка состояния и обратно
+    PACK = 6
+
+    def pack(self):
+        return (self.x, self.top, self.gap, self.scored, self.danger, self.seq)
+
+    def unpack(self, data, i):
+        self.x, self.top, self.gap, scored, danger, self.seq = data[i:i + 6]
+        self.bottom = self.top + self.gap
+        self.rect_top.update(self.x, 0, self.width, self.top)
+        self.rect_bottom.update(self.x, self.bottom, self.width, HEIGHT)
+        self.scored = bool(scored)
+        self.danger = bool(danger)
+        self.alive = True
 
     def update(self, speed):
         self.x -= speed
         self.rect_top.x = self.rect_bottom.x = self.x
 
+    # Обе части трубы вырезаются из одного спрайта во всю высоту экрана
+    def blit_items(self, out, dx=0):
+        img = sprites.get("rect", self.width, HEIGHT, PIPE_DANGER_COLOR if self.danger else PIPE_COLOR)
+        x = self.x + dx
+        out.append((img, (x, 0), (0, 0, self.width, self.top)))
+        out.append((img, (x, self.bottom), (0, 0, self.width, HEIGHT - self.bottom)))
+        return out
+
     def draw(self):
-        color = PIPE_DANGER_COLOR if self.danger else PIPE_COLOR
-        pygame.draw.rect(screen, color, self.rect_top)
-        pygame.draw.rect(screen, color, self.rect_bottom)
+        return screen.blits(self.blit_items([]))
 
 class Coin:
+    __slots__ = ("rect", "collected", "alive", "seq")
+
     def __init__(self, x, y):
         self.rect = pygame.Rect(x, y, 25, 25)
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        self.rect.topleft = (x, y)
         self.collected = False
+        self.alive = True
+
+    @classmethod
+    def blank(cls):
+        return cls(0, 0)
+
+    PACK = 4
+
+    def pack(self):
+        return (self.rect.x, self.rect.y, self.collected, self.seq)
+
+    def unpack(self, data, i):
+        self.rect.x, self.rect.y, collected, self.seq = data[i:i + 4]
+        self.collected = bool(collected)
+        self.alive = True
 
     def update(self, speed):
         self.rect.x -= speed
 
-    def draw(self):
+    def blit_items(self, out, dx=0):
         if not self.collected:
-            pygame.draw.ellipse(screen, COIN_COLOR, self.rect)
+            out.append((sprites.get("ellipse", 25, 25, COIN_COLOR), self.rect.move(dx, 0)))
+        return out
+
+    def draw(self):
+        return screen.blits(self.blit_items([]))
 
 class PowerUp:
+    __slots__ = ("kind", "rect", "alive", "seq")
+
     def __init__(self, x, y, kind):
-        self.kind = kind
         self.rect = pygame.Rect(x, y, 25, 25)
+        self.reset(x, y, kind)
+
+    def reset(self, x, y, kind):
+        self.kind = kind
+        self.rect.topleft = (x, y)
+        self.alive = True
+
+    @classmethod
+    def blank(cls):
+        return cls(0, 0, "shield")
+
+    PACK = 4
+
+    def pack(self):
+        return (self.rect.x, self.rect.y, self.kind == "shield", self.seq)
+
+    def unpack(self, data, i):
+        self.rect.x, self.rect.y, shield, self.seq = data[i:i + 4]
+        self.kind = "shield" if shield else "magnet"
+        self.alive = True
 
     def update(self, speed):
         self.rect.x -= speed
 
-    def draw(self):
+    def blit_items(self, out, dx=0):
         color = SHIELD_COLOR if self.kind == "shield" else MAGNET_COLOR
-        pygame.draw.rect(screen, color, self.rect)
+        out.append((sprites.get("rect", 25, 25, color), self.rect.move(dx, 0)))
+        return out
+
+    def draw(self):
+        return screen.blits(self.blit_items([]))
 
 class Heart:
+    __slots__ = ("rect", "collected", "alive", "seq")
+
     def __init__(self, x, y):
         self.rect = pygame.Rect(x, y, 30, 30)
+        self.reset(x, y)
+
+    def reset(self, x, y):
+        self.rect.topleft = (x, y)
         self.collected = False
+        self.alive = True
+
+    @classmethod
+    def blank(cls):
+        return cls(0, 0)
+
+    PACK = 4
+
+    def pack(self):
+        return (self.rect.x, self.rect.y, self.collected, self.seq)
+
+    def unpack(self, data, i):
+        self.rect.x, self.rect.y, collected, self.seq = data[i:i + 4]
+        self.collected = bool(collected)
+        self.alive = True
 
     def update(self, speed):
         self.rect.x -= speed
 
-    def draw(self):
+    def blit_items(self, out, dx=0):
         if not self.collected:
-            pygame.draw.ellipse(screen, HEART_COLOR, self.rect)
+            out.append((sprites.get("ellipse", 30, 30, HEART_COLOR), self.rect.move(dx, 0)))
+        return out
+
+    def draw(self):
+        return screen.blits(self.blit_items([]))
 
 class Enemy:
-    def __init__(self, x, y):
+    __slots__ = ("rect", "speed", "alive", "seq")
+
+    def __init__(self, x, y, speed):
         self.rect = pygame.Rect(x, y, 40, 40)
-        self.speed = random.randint(2, 4)
+        self.reset(x, y, speed)
+
+    def reset(self, x, y, speed):
+        self.rect.topleft = (x, y)
+        self.speed = speed
+        self.alive = True
+
+    @classmethod
+    def blank(cls):
+        return cls(0, 0, 0)
+
+    PACK = 4
+
+    def pack(self):
+        return (self.rect.x, self.rect.y, self.speed, self.seq)
+
+    def unpack(self, data, i):
+        self.rect.x, self.rect.y, self.speed, self.seq = data[i:i + 4]
+        self.alive = True
 
     def update(self):
         self.rect.x -= self.speed
 
+    def blit_items(self, out, dx=0):
+        out.append((sprites.get("rect", 40, 40, ENEMY_COLOR), self.rect.move(dx, 0)))
+        return out
+
     def draw(self):
-        pygame.draw.rect(screen, ENEMY_COLOR, self.rect)
+        return screen.blits(self.blit_items([]))
+
+# Список объектов одного вида с пулом. remove() только помечает объект,
+# сам список уплотняется один раз за тик в sweep(): объекты уходят за левый
+# край по порядку появления, поэтому обычно это срез с начала списка.
+# Удалённые экземпляры попадают в free и переиспользуются в spawn().
+# Объекты с общей скоростью появляются у правого края и едут влево,
+# поэтому список всегда отсортирован по x — query() ищет бинарным поиском.
+class EntityList:
+    def __init__(self, cls, width, key=None):
+        self.cls = cls
+        self.width = width
+        self.key = key or rect_x
+        self.items = []
+        self.free = []
+        self.dead = 0
+        self.spawned = 0
+
+    def spawn(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+        else:
+            obj = self.cls(*args)
+        obj.seq = self.spawned
+        self.spawned += 1
+        self.items.append(obj)
+        return obj
+
+    def remove(self, obj):
+        if obj.alive:
+            obj.alive = False
+            self.dead += 1
+
+    def sweep(self):
+        if not self.dead:
+            return
+        items = self.items
+        lead = 0
+        while lead < len(items) and not items[lead].alive:
+            lead += 1
+        if lead == self.dead:
+            self.free.extend(items[:lead])
+            del items[:lead]
+        else:
+            self.free.extend(obj for obj in items if not obj.alive)
+            items[:] = [obj for obj in items if obj.alive]
+        self.dead = 0
+
+    # Объекты, пересекающие полосу x0 <= x < x1
+    def query(self, x0, x1):
+        items = self.items
+        # На коротком списке бинарный поиск дороже прямой проверки
+        if len(items) <= 4:
+            return items
+        lo = bisect_right(items, x0 - self.width, key=self.key)
+        hi = bisect_left(items, x1, lo, key=self.key)
+        return items[lo:hi]
+
+    # Все объекты подряд в одном массиве целых (по cls.PACK на объект)
+    def pack(self):
+        return array("q", [v for obj in self.items for v in obj.pack()])
+
+    # Обратно из pack(): сначала переиспользуются текущие объекты,
+    # затем пул, новые создаются только при нехватке
+    def restore(self, data, spawned):
+        size = self.cls.PACK
+        items = self.items
+        n = len(data) // size
+        if n < len(items):
+            for obj in items[n:]:
+                obj.alive = False
+            self.free.extend(items[n:])
+            del items[n:]
+        while len(items) < n:
+            items.append(self.free.pop() if self.free else self.cls.blank())
+        for k, obj in enumerate(items):
+            obj.unpack(data, k * size)
+        self.dead = 0
+        self.spawned = spawned
+
+    def clear(self):
+        for obj in self.items:
+            obj.alive = False
+        self.free.extend(self.items)
+        self.items.clear()
+        self.dead = 0
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+rect_x = attrgetter("rect.x")
+
+# Индекс по x для объектов с разной скоростью (враги): каждый тик список
+# пересортировывается по x (он почти отсортирован, так что это почти O(n)),
+# query() ищет бинарным поиском и отдаёт объекты в порядке появления
+class XIndex:
+    def __init__(self, width):
+        self.width = width
+        self.order = []
+
+    def build(self, items):
+        order = self.order
+        order[:] = items
+        order.sort(key=rect_x)
+
+    def query(self, x0, x1):
+        order = self.order
+        lo = bisect_right(order, x0 - self.width, key=rect_x)
+        hi = bisect_left(order, x1, lo, key=rect_x)
+        found = order[lo:hi]
+        if len(found) > 1:
+            found.sort(key=spawn_seq)
+        return found
+
+spawn_seq = attrgetter("seq")
+
+# Широкая фаза для птиц: прямоугольники группируются в полосы с одинаковыми
+# left, right и высотой и сортируются по top. Тогда объекты полосы по x —
+# один запрос к индексу, а задевающие объект по высоте ищутся бинарным поиском.
+def rect_bands(rects):
+    if len(rects) == 1:
+        r = rects[0]
+        return [(r.left, r.right, r.h, [0], [r.top])]
+    groups = {}
+    for i, r in enumerate(rects):
+        groups.setdefault((r.left, r.right, r.h), []).append(i)
+    bands = []
+    for (left, right, h), members in groups.items():
+        members.sort(key=lambda i: rects[i].top)
+        bands.append((left, right, h, members, [rects[i].top for i in members]))
+    return bands
+
+# Номера прямоугольников полосы, пересекающих по высоте top..bottom
+def band_members(band, top, bottom):
+    if top >= bottom:
+        return ()
+    left, right, h, members, tops = band
+    return members[bisect_right(tops, top - h):bisect_left(tops, bottom)]
+
+# Пары (номер прямоугольника, объект), у которых rect пересекаются — то же,
+# что colliderect. У каждого прямоугольника объекты идут в порядке index.query
+# (EntityList или XIndex), как при прямой проверке. bands — готовый
+# rect_bands(rects), если прямоугольники спрашивают несколько индексов подряд.
+def candidate_pairs(rects, index, bands=None):
+    pairs = []
+    for left, right, h, members, tops in bands or rect_bands(rects):
+        found = index.query(left, right)
+        if not found:
+            continue
+        # Одна птица в полосе — просто точная проверка
+        if len(members) == 1:
+            i = members[0]
+            colliderect = rects[i].colliderect
+            pairs.extend((i, obj) for obj in found if colliderect(obj.rect))
+            continue
+        for obj in found:
+            r = obj.rect
+            if r.left < right and r.right > left and r.w and r.h:
+                lo = bisect_right(tops, r.top - h)
+                hi = bisect_left(tops, r.bottom, lo)
+                if lo < hi:
+                    pairs.extend(zip(members[lo:hi], repeat(obj)))
+    return pairs
 
 # Менеджеры
+
+# Миссии описаны в missions.json: счётчик (coins/pipes/hearts), цель и
+# награда. "missions" активны всегда, из "daily" каждый день выбираются
+# daily_count штук по сиду дня (у всех игроков одни и те же).
+MISSIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "missions.json")
+MISSION_COUNTERS = ("coins", "pipes", "hearts")
+MISSIONS_SHOWN = 3  # сколько невыполненных миссий видно в HUD
+_mission_file = {}
+
+def load_missions(path=MISSIONS_FILE):
+    if path not in _mission_file:
+        with open(path, encoding="utf-8") as f:
+            _mission_file[path] = json.load(f)
+    return _mission_file[path]
+
+# Миссии на день daily (сид дня, см. daily_seed) или только постоянные
+def mission_defs(daily=None, path=MISSIONS_FILE):
+    data = load_missions(path)
+    defs = list(data["missions"])
+    if daily is not None:
+        pool = data.get("daily", [])
+        picks = random.Random(daily).sample(pool, min(data.get("daily_count", 0), len(pool)))
+        defs += [dict(d, id=f"{d['id']}@{daily}") for d in picks]
+    return defs
+
+# Миссии подписаны на свой счётчик: событие notify() проверяет только
+# невыполненные миссии этого счётчика, отсортированные по цели (ближайшая
+# в конце списка), так что сотни миссий не стоят ничего между событиями.
+# version растёт при каждом изменении — по нему HUD пересобирает строки.
 class MissionsManager:
-    def __init__(self, bird):
+    def __init__(self, bird, daily=None):
         self.bird = bird
-        self.missions = [
-            {"description": "Собери 10 монет", "target": 10, "completed": False},
-            {"description": "Пройди 20 труб", "target": 20, "completed": False},
-            {"description": "Собери 3 сердечка", "target": 3, "completed": False},
-        ]
-        self.coins_collected = 0
-        self.pipes_passed = 0
-        self.hearts_collected = 0
-
-    def update(self):
-        self.coins_collected = self.bird.coins
-        self.pipes_passed = self.bird.score
+        self.missions = [dict(d, completed=False) for d in mission_defs(daily)]
+        self.counters = dict.fromkeys(MISSION_COUNTERS, 0)
+        self.version = 0
+        self.lines_version = -1
+        self.lines = []
+        self.reindex()
+
+    # Пересобрать подписки (после загрузки сохранения или снимка)
+    def reindex(self):
+        self.active = {c: [] for c in MISSION_COUNTERS}
         for m in self.missions:
             if not m["completed"]:
-                if m["description"] == "Собери 10 монет" and self.coins_collected >= m["target"]:
-                    m["completed"] = True
-                    self.bird.coins += 10
-                elif m["description"] == "Пройди 20 труб" and self.pipes_passed >= m["target"]:
-                    m["completed"] = True
-                    self.bird.coins += 15
-                elif m["description"] == "Собери 3 сердечка" and self.hearts_collected >= m["target"]:
-                    m["completed"] = True
-                    self.bird.coins += 20
+                self.active[m["counter"]].append(m)
+        for waiting in self.active.values():
+            waiting.sort(key=lambda m: -m["target"])
+        self.version += 1
+
+    # Новое значение счётчика; выполненные миссии дают награду монетами
+    def notify(self, counter, value):
+        if self.counters[counter] == value:
+            return
+        self.counters[counter] = value
+        self.version += 1
+        waiting = self.active[counter]
+        while waiting and value >= waiting[-1]["target"]:
+            m = waiting.pop()
+            m["completed"] = True
+            self.bird.coins += m["reward"]
+
+    # Строки прогресса для HUD: (подпись, значение), пересчёт только при изменениях
+    def progress(self):
+        if self.lines_version != self.version:
+            self.lines = []
+            for m in self.missions:
+                if not m["completed"]:
+                    self.lines.append((f"{m['description']}: ", f"{self.counters[m['counter']]}/{m['target']}"))
+                    if len(self.lines) == MISSIONS_SHOWN:
+                        break
+            self.lines_version = self.version
+        return self.lines
 
 class ImprovementsManager:
+    cost_step = 10  # на сколько дорожает улучшение после покупки
+
     def __init__(self, bird):
         self.bird = bird
         self.improvements = {
@@ -299,7 +847,7 @@ class ImprovementsManager:
         if self.bird.coins >= self.improvements[imp]["cost"]:
             self.bird.coins -= self.improvements[imp]["cost"]
             self.improvements[imp]["level"] += 1
-            self.improvements[imp]["cost"] += 10
+            self.improvements[imp]["cost"] += self.cost_step
             self.apply_improvements()
 
     def apply_improvements(self):
@@ -316,279 +864,1714 @@ class ImprovementsManager:
         y += 40
         draw_text(f"Сила прыжка (3): уровень {self.improvements['jump_power']['level']} — цена {self.improvements['jump_power']['cost']}", 50, y)
 
+# Ветер: толкает птицу вверх/вниз, направление меняется каждые WIND_GUST тиков
+WIND_FORCE = 0.1
+WIND_GUST = 90
+WEATHER_TYPES = ["clear", "rain", "fog", "wind"]
+
 class Weather:
-    def __init__(self):
-        self.type = random.choice(["clear", "rain", "fog", "wind"])
+    def __init__(self, rng=random):
+        self.rng = rng
+        self.type = rng.choice(WEATHER_TYPES)
         self.timer = 0
+        self.wind = 0.0
 
     def update(self):
         self.timer += 1
         if self.timer > 1800:
             self.timer = 0
-            self.type = random.choice(["clear", "rain", "fog", "wind"])
+            self.type = self.rng.choice(WEATHER_TYPES)
+        if self.type == "wind":
+            self.wind = WIND_FORCE if (self.timer // WIND_GUST) % 2 else -WIND_FORCE
+        else:
+            self.wind = 0.0
 
     def apply_effect(self, bird):
-        if self.type == "wind":
+        bird.vel += self.wind
+
+    # ticks — счётчик тиков игры: капли сдвигаются на прошедшие тики
+    def draw(self, ticks):
+        return weather_fx.draw(self, ticks)
+
+# Отрисовка погоды без выделений памяти в кадре: туман — одна готовая
+# поверхность, дождь — постоянные капли в массивах NumPy, двигаются разом.
+# Капли идут по тикам симуляции, а не по кадрам, так что скорость дождя
+# не зависит от частоты кадров (и стоит на паузе вместе с игрой).
+class WeatherEffects:
+    def __init__(self, rain_density=20):
+        self.rain_density = rain_density
+        self.fog = None
+        self.drop = None
+        self.drops = None
+        self.last_tick = None
+
+    def _init_rain(self):
+        import numpy as np
+        self.rng = np.random.default_rng()
+        n = self.rain_density
+        self.drop = sprites.get("rect", 1, 11, (0, 0, 255))
+        self.drops = np.empty((n, 2), dtype=np.int32)
+        self.drops[:, 0] = self.rng.integers(0, WIDTH + 1, n)
+        self.drops[:, 1] = self.rng.integers(-10, HEIGHT + 1, n)
+        self.drop_speed = self.rng.integers(6, 13, n, dtype=np.int32)
+
+    def update_rain(self, ticks):
+        if self.drops is None or len(self.drops) != self.rain_density:
+            self._init_rain()
+        # Новая игра (счётчик пошёл заново) или первый кадр дождя — без сдвига
+        steps = ticks - self.last_tick if self.last_tick is not None and ticks >= self.last_tick else 0
+        self.last_tick = ticks
+        if not steps:
+            return
+        drops = self.drops
+        drops[:, 1] += self.drop_speed * steps
+        fallen = drops[:, 1] > HEIGHT
+        count = int(fallen.sum())
+        if count:
+            drops[fallen, 1] = (drops[fallen, 1] + 10) % (HEIGHT + 11) - 10
+            drops[fallen, 0] = self.rng.integers(0, WIDTH + 1, count)
+
+    def draw(self, weather, ticks):
+        if weather.type == "rain":
+            self.update_rain(ticks)
+            drop = self.drop
+            return screen.blits([(drop, pos) for pos in self.drops.tolist()])
+        elif weather.type == "fog":
+            if self.fog is None:
+                self.fog = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+                self.fog.fill((200, 200, 200, 100))
+            return [screen.blit(self.fog, (0, 0))]
+        elif weather.type == "wind":
+            return [draw_text("Ветер дует!", WIDTH - 120, 10, (0, 0, 255))]
+        return []
+
+weather_fx = WeatherEffects()
+
+# Хранилище сохранения. Файл — базовая копия {"generation", "data", "crc"},
+# к ней журнал .journal: по строке на сохранение, только изменившиеся поля.
+# Запись — в фоновом потоке: submit() лишь запоминает последнее состояние,
+# кадр на диске не ждёт. Каждые compact_every записей база переписывается
+# через временный файл и rename, прошлые поколения остаются как .1, .2.
+# При чтении битая база заменяется предыдущим поколением, а журнал
+# читается до первой испорченной строки (обрыв при падении).
+class SaveStore:
+    def __init__(self, path=SAVE_FILE, generations=3, compact_every=32):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.generations = generations
+        self.compact_every = compact_every
+        self.generation = 0
+        self.data = None       # то, что уже лежит на диске
+        self.records = 0       # строк в журнале текущего поколения
+        self.pending = None
+        self.closing = False
+        self.cond = threading.Condition()
+        self.thread = None
+
+    @staticmethod
+    def _crc(data):
+        return zlib.crc32(json.dumps(data, sort_keys=True).encode())
+
+    def _read_base(self, path):
+        try:
+            with open(path, "r") as f:
+                base = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(base, dict):
+            return None
+        # Старый формат: просто словарь сохранения
+        if "generation" not in base:
+            return None, base
+        if base.get("crc") != self._crc(base.get("data")):
+            return None
+        return base["generation"], base["data"]
+
+    # Наибольшее поколение, упомянутое в любом файле — в базах (даже битых)
+    # и в строках журнала. Новая база получает номер больше него, иначе
+    # после отката строки журнала потерянного поколения совпали бы с ней.
+    def _last_generation(self):
+        last = 0
+        for i in range(self.generations):
+            path = self.path if i == 0 else f"{self.path}.{i}"
+            try:
+                with open(path, "r") as f:
+                    g = json.load(f).get("generation")
+            except (OSError, ValueError, AttributeError):
+                continue
+            if isinstance(g, int):
+                last = max(last, g)
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        g = json.loads(line).get("g")
+                    except (ValueError, AttributeError):
+                        continue
+                    if isinstance(g, int):
+                        last = max(last, g)
+        except OSError:
             pass
-
-    def draw(self):
-        if self.type == "rain":
-            for _ in range(20):
-                x,y = random.randint(0,WIDTH), random.randint(0,HEIGHT)
-                pygame.draw.line(screen, (0,0,255), (x,y), (x,y+10), 1)
-        elif self.type == "fog":
-            fog = pygame.Surface((WIDTH,HEIGHT), pygame.SRCALPHA)
-            fog.fill((200,200,200,100))
-            screen.blit(fog, (0,0))
-        elif self.type == "wind":
-            draw_text("Ветер дует!", WIDTH - 120, 10, (0,0,255))
+        return last
+
+    # Синхронно, один раз за сессию: последнее целое поколение + его журнал
+    def read(self):
+        self.generation = self._last_generation()
+        for i in range(self.generations):
+            path = self.path if i == 0 else f"{self.path}.{i}"
+            base = self._read_base(path)
+            if base is not None:
+                break
+        else:
+            return None
+        generation, data = base
+        self.records = 0
+        clean = i == 0 and generation is not None
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        clean = False
+                        break
+                    if rec.get("g") != generation or rec.get("c") != self._crc(rec.get("d")):
+                        clean = False
+                        break
+                    data.update(rec["d"])
+                    self.records += 1
+        except OSError:
+            pass
+        # После отката или старого формата следующая запись — сразу новая база
+        if not clean:
+            self.records = self.compact_every
+        self.data = dict(data)
+        return data
+
+    def submit(self, data):
+        with self.cond:
+            self.pending = data
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    # Дописать всё ожидающее и остановить поток (при выходе из игры)
+    def close(self):
+        with self.cond:
+            if self.thread is None:
+                return
+            self.closing = True
+            self.cond.notify()
+        self.thread.join()
+        self.thread = None
+        self.closing = False
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.pending is None and not self.closing:
+                    self.cond.wait()
+                data, self.pending = self.pending, None
+                closing = self.closing
+            if data is not None:
+                try:
+                    self._write(data)
+                except OSError as e:
+                    print(f"автосохранение не удалось: {e}", file=sys.stderr)
+            if closing and self.pending is None:
+                return
+
+    def _write(self, data):
+        old = self.data or {}
+        changed = {k: v for k, v in data.items() if old.get(k) != v}
+        if not changed:
+            return
+        if self.data is None or self.records >= self.compact_every:
+            self._compact(data)
+            return
+        line = json.dumps({"g": self.generation, "d": changed, "c": self._crc(changed)})
+        with open(self.journal_path, "a") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.data = dict(data)
+        self.records += 1
+
+    def _compact(self, data):
+        # Без read() номер поколения ещё не сверен с файлами
+        if self.data is None:
+            self.generation = max(self.generation, self._last_generation())
+        generation = self.generation + 1
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"generation": generation, "data": data, "crc": self._crc(data)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        for i in range(self.generations - 1, 0, -1):
+            older = self.path if i == 1 else f"{self.path}.{i - 1}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i}")
+        os.replace(tmp, self.path)
+        # Записи журнала старого поколения при чтении всё равно отбрасываются
+        open(self.journal_path, "w").close()
+        self.generation = generation
+        self.data = dict(data)
+        self.records = 0
+
+save_store = SaveStore()
+
+# Таблица рекордов в SQLite: все забеги хранятся в таблице runs с индексом
+# (сложность, очки, монеты). При open() для каждой сложности один раз
+# читаются лучшие k по индексу, дальше они живут в памяти: top() — просто
+# срез готового списка, record() вставляет забег в список из k элементов.
+# Сами строки пишет фоновый поток пачками, одной транзакцией на пачку.
+def leader_rank(row):
+    return (-row[1], -row[2])
+
+class Leaderboard:
+    def __init__(self, path=LEADERBOARD_FILE, k=LEADERBOARD_TOP, batch=64, interval=2.0):
+        self.path = path
+        self.k = k
+        self.batch = batch
+        self.interval = interval
+        self.best = {}         # сложность -> [(имя, очки, монеты, сид, длительность)]
+        self.pending = []
+        self.closing = False
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("""CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY, name TEXT, difficulty TEXT, score INTEGER, coins INTEGER,
+            seed INTEGER, duration REAL, created REAL)""")
+        db.execute("CREATE INDEX IF NOT EXISTS runs_top ON runs (difficulty, score DESC, coins DESC)")
+        return db
+
+    def open(self):
+        db = self._connect()
+        try:
+            for difficulty in DIFFICULTIES:
+                self.best[difficulty] = db.execute(
+                    "SELECT name, score, coins, seed, duration FROM runs WHERE difficulty = ? "
+                    "ORDER BY score DESC, coins DESC, id LIMIT ?", (difficulty, self.k)).fetchall()
+        finally:
+            db.close()
+
+    def top(self, difficulty, n=None):
+        return self.best.get(difficulty, [])[:n]
+
+    def record(self, name, difficulty, score, coins, seed, duration):
+        row = (name, score, coins, seed, duration)
+        best = self.best.setdefault(difficulty, [])
+        insort(best, row, key=leader_rank)
+        del best[self.k:]
+        with self.cond:
+            self.pending.append((name, difficulty, score, coins, seed, duration, time.time()))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="leaderboard", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            if self.thread is None:
+                return
+            self.closing = True
+            self.cond.notify()
+        self.thread.join()
+        self.thread = None
+        self.closing = False
+
+    def _run(self):
+        db = self._connect()
+        while True:
+            with self.cond:
+                while not self.pending and not self.closing:
+                    self.cond.wait()
+                # Копим пачку: до batch забегов или interval секунд
+                deadline = time.monotonic() + self.interval
+                while len(self.pending) < self.batch and not self.closing:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self.cond.wait(left)
+                rows, self.pending = self.pending, []
+                closing = self.closing
+            if rows:
+                try:
+                    with db:
+                        db.executemany("INSERT INTO runs (name, difficulty, score, coins, seed, duration, created) "
+                                       "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                except sqlite3.Error as e:
+                    print(f"таблица рекордов: {e}", file=sys.stderr)
+            if closing:
+                db.close()
+                return
+
+leaderboard = Leaderboard()
 
 class SaveManager:
-    def __init__(self, bird, missions_manager, improvements_manager):
+    def __init__(self, bird, missions_manager, improvements_manager, store=None):
         self.bird = bird
         self.missions_manager = missions_manager
         self.improvements_manager = improvements_manager
+        self.store = store or save_store
 
-    def save(self):
-        data = {
+    # Текущий прогресс в виде словаря сохранения
+    def collect(self):
+        return {
             "coins": self.bird.coins,
             "score": self.bird.score,
             "lives": self.bird.lives,
-            "missions": [(m["description"], m["completed"]) for m in self.missions_manager.missions],
+            "missions": [[m["id"], m["completed"]] for m in self.missions_manager.missions],
             "improvements": {k: v["level"] for k, v in self.improvements_manager.improvements.items()},
         }
-        with open(SAVE_FILE, "w") as f:
-            json.dump(data, f)
+
+    # Не блокирует: запись уходит в фоновый поток хранилища
+    def save(self):
+        self.store.submit(self.collect())
+
+    def read(self):
+        return self.store.read()
 
     def load(self):
-        if os.path.exists(SAVE_FILE):
-            with open(SAVE_FILE, "r") as f:
-                data = json.load(f)
-            self.bird.coins = data.get("coins", 0)
-            self.bird.score = data.get("score", 0)
-            self.bird.lives = data.get("lives", 3)
-            comp = dict(data.get("missions", []))
-            for m in self.missions_manager.missions:
-                m["completed"] = comp.get(m["description"], False)
-            imp_lvls = data.get("improvements", {})
-            for k, lvl in imp_lvls.items():
-                if k in self.improvements_manager.improvements:
-                    self.improvements_manager.improvements[k]["level"] = lvl
-            self.improvements_manager.apply_improvements()
+        data = self.read()
+        if data:
+            self.apply(data)
+
+    def apply(self, data):
+        self.bird.coins = data.get("coins", 0)
+        self.bird.score = data.get("score", 0)
+        self.bird.lives = data.get("lives", 3)
+        # Старые сохранения ссылаются на миссии по описанию
+        comp = dict(data.get("missions", []))
+        for m in self.missions_manager.missions:
+            m["completed"] = comp.get(m["id"], comp.get(m["description"], False))
+        self.missions_manager.reindex()
+        imp_lvls = data.get("improvements", {})
+        for k, lvl in imp_lvls.items():
+            if k in self.improvements_manager.improvements:
+                self.improvements_manager.improvements[k]["level"] = lvl
+        self.improvements_manager.apply_improvements()
+
+# Участки кадра в порядке выполнения (колонки CSV-экспорта)
+PROFILE_PHASES = (
+    "events", "autopilot", "spawn", "weather", "bird", "pipes", "coins", "powerups", "hearts", "enemies",
+    "sweep", "record", "world", "hud", "weather_draw", "bird_draw", "overlay", "display", "capture", "wait",
+)
+
+# Профилировщик кадра. lap(name) добавляет к участку name время с прошлой
+# отметки; end_frame() закрывает кадр, кладёт времена в скользящие окна и
+# пишет строку в файл экспорта (.csv или JSON lines). Выключенный lap сразу
+# возвращается; в GameState.step он вообще не вызывается, поэтому отметки
+# можно держать в коде всегда.
+class Profiler:
+    def __init__(self, window=300):
+        self.enabled = False
+        self.overlay = False
+        self.window = window
+        self.samples = {}
+        self.frame = {}
+        self.frames = 0
+        self.export = None
+        self.csv = False
+        self.lines = []
+        self.last = self.start = 0.0
+
+    def enable(self, export_path=None):
+        self.enabled = True
+        if export_path:
+            self.export = open(export_path, "w", encoding="utf-8")
+            self.csv = export_path.endswith(".csv")
+            if self.csv:
+                self.export.write(",".join(("frame", "total") + PROFILE_PHASES) + "\n")
+        self.begin_frame()
+
+    def begin_frame(self):
+        self.frame = {}
+        self.last = self.start = time.perf_counter()
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.frame[name] = self.frame.get(name, 0.0) + (now - self.last) * 1000
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        frame = self.frame
+        frame["total"] = (time.perf_counter() - self.start) * 1000
+        for name, ms in frame.items():
+            window = self.samples.get(name)
+            if window is None:
+                window = self.samples[name] = deque(maxlen=self.window)
+            window.append(ms)
+        if self.export:
+            if self.csv:
+                row = [str(self.frames), f"{frame['total']:.4f}"]
+                row += [f"{frame.get(name, 0.0):.4f}" for name in PROFILE_PHASES]
+                self.export.write(",".join(row) + "\n")
+            else:
+                self.export.write(json.dumps({"frame": self.frames, **{k: round(v, 4) for k, v in frame.items()}}) + "\n")
+        self.frames += 1
+        self.begin_frame()
+
+    # p50/p95/p99 по скользящему окну, мс
+    def percentiles(self, name):
+        data = sorted(self.samples.get(name, ()))
+        if not data:
+            return 0.0, 0.0, 0.0
+        last = len(data) - 1
+        return tuple(data[min(last, int(q * len(data)))] for q in (0.5, 0.95, 0.99))
+
+    def report(self):
+        return {name: self.percentiles(name) for name in self.samples}
+
+    # Оверлей: строки пересчитываются раз в 30 кадров, чтобы не гонять кэш текста
+    def draw_overlay(self):
+        if self.frames % 30 == 0 or not self.lines:
+            names = ["total"] + [n for n in PROFILE_PHASES if n in self.samples]
+            self.lines = [
+                (name, *(f"{ms:.2f}" for ms in self.percentiles(name)))
+                for name in names
+            ]
+        x, y = 10, 160
+        box = pygame.Rect(x - 4, y - 4, 270, 20 * len(self.lines) + 28)
+        screen.fill((255, 255, 255), box)
+        columns = (0, 120, 170, 220)
+        for line in [("мс", "p50", "p95", "p99")] + self.lines:
+            for dx, cell in zip(columns, line):
+                draw_text(cell, x + dx, y)
+            y += 20
+        return [box]
+
+    def close(self):
+        if self.export:
+            self.export.close()
+            self.export = None
+
+profiler = Profiler()
+
+# Действия игрока за один тик (битовая маска)
+JUMP = 1
+PAUSE = 2
+MENU = 4
+BUY_MAGNET = 8
+BUY_SHIELD = 16
+BUY_JUMP = 32
+
+KEY_ACTIONS = {
+    pygame.K_SPACE: JUMP,
+    pygame.K_p: PAUSE,
+    pygame.K_m: MENU,
+    pygame.K_1: BUY_MAGNET,
+    pygame.K_2: BUY_SHIELD,
+    pygame.K_3: BUY_JUMP,
+}
+
+# Генератор уровня: ленивый поток событий появления (тик, вид, x, y, доп.),
+# который считается кусками по CHUNK_TICKS тиков на полкуска вперёд.
+# Каждый кусок — свой random.Random от (сид, номер куска), так что уровень
+# целиком задаётся сидом и его можно передать другому игроку. Ритм тот же,
+# что у прежних таймеров: объект появляется раз в rate + 1 тиков. Монеты и
+# сердца ставятся внутрь просвета ближайшей следующей трубы, чтобы их можно
+# было достать; если в куске труб больше нет, они ждут первую трубу следующего.
+# Доп. поле: у трубы — опасная ли она, у бонуса — 1 для щита, у врага — скорость.
+SPAWN_PIPE, SPAWN_COIN, SPAWN_POWERUP, SPAWN_HEART, SPAWN_ENEMY = range(5)
+SPAWN_SIZES = (PIPE_WIDTH, 25, 25, 30, 40)
+CHUNK_TICKS = 600
+
+class LevelStream:
+    def __init__(self, seed, enemy_rate, pipe_rate=90, coin_rate=150, powerup_rate=600, heart_rate=900, gap=PIPE_GAP):
+        self.seed = seed
+        # Интервалы появления в тиках; читаются при расчёте очередного куска
+        self.pipe_rate = pipe_rate
+        self.coin_rate = coin_rate
+        self.powerup_rate = powerup_rate
+        self.heart_rate = heart_rate
+        self.enemy_rate = enemy_rate
+        self.gap = gap
+        self.events = deque()
+        self.restart()
+
+    # Уровень с самого начала: те же сид и настройки
+    def restart(self):
+        self.tick = 0
+        self.chunk = 0
+        self.end = 0
+        self.last = [0] * 5        # тик последнего появления каждого вида
+        self.waiting = []          # монеты и сердца, ждущие трубу
+        self.events.clear()
+
+    def _generate(self):
+        rng = random.Random(self.seed * 1000003 + self.chunk)
+        end = self.end + CHUNK_TICKS
+        rates = (self.pipe_rate, self.coin_rate, self.powerup_rate, self.heart_rate, self.enemy_rate)
+        due = []
+        for kind, rate in enumerate(rates):
+            t = self.last[kind] + rate + 1
+            while t <= end:
+                due.append((t, kind))
+                self.last[kind] = t
+                t += rate + 1
+
+        events = []
+        pipes = []
+        for t, kind in due:
+            if kind == SPAWN_PIPE:
+                top = rng.randint(PIPE_MARGIN_TOP, HEIGHT - PIPE_MARGIN_BOTTOM - self.gap)
+                pipes.append((t, top))
+                events.append((t, kind, WIDTH, top, rng.random() < 0.2))
+        waiting = self.waiting
+        self.waiting = []
+        for t, kind in due:
+            if kind == SPAWN_COIN or kind == SPAWN_HEART:
+                waiting.append((t, kind))
+            elif kind == SPAWN_POWERUP:
+                shield = rng.random() < 0.5
+                events.append((t, kind, WIDTH, rng.randint(50, HEIGHT - 50), shield))
+            elif kind == SPAWN_ENEMY:
+                events.append((t, kind, WIDTH, rng.randint(50, HEIGHT - 50), rng.randint(2, 4)))
+        # Монета или сердце — в просвет первой трубы не раньше своего тика
+        ticks = [t for t, _ in pipes]
+        for t, kind in waiting:
+            i = bisect_left(ticks, t)
+            if i == len(pipes):
+                self.waiting.append((t, kind))
+                continue
+            pipe_tick, top = pipes[i]
+            size = SPAWN_SIZES[kind]
+            x = WIDTH + (PIPE_WIDTH - size) // 2
+            # В узком просвете (меньше size + 10) — просто посередине
+            lo = top + 5
+            hi = max(lo, top + self.gap - size - 5)
+            if hi == lo:
+                lo = hi = top + (self.gap - size) // 2
+            events.append((pipe_tick, kind, x, rng.randint(lo, hi), 0))
+
+        events.sort(key=lambda e: (e[0], e[1]))
+        self.events.extend(events)
+        self.end = end
+        self.chunk += 1
+
+    # События, которые наступают на очередном тике
+    def advance(self):
+        self.tick += 1
+        if self.tick + CHUNK_TICKS // 2 > self.end:
+            self._generate()
+        events = self.events
+        if not events or events[0][0] > self.tick:
+            return ()
+        due = []
+        while events and events[0][0] <= self.tick:
+            due.append(events.popleft())
+        return due
+
+    # Для снимка: всё, кроме настроек, одним массивом целых
+    def pack(self):
+        data = array("q", (self.tick, self.chunk, self.end, *self.last, len(self.waiting)))
+        for t, kind in self.waiting:
+            data.extend((t, kind))
+        for event in self.events:
+            data.extend(event)
+        return data
+
+    def unpack(self, data):
+        self.tick, self.chunk, self.end = data[:3]
+        self.last[:] = data[3:8]
+        n = data[8]
+        self.waiting = [(data[i], data[i + 1]) for i in range(9, 9 + 2 * n, 2)]
+        self.events.clear()
+        self.events.extend(tuple(data[i:i + 5]) for i in range(9 + 2 * n, len(data), 5))
+
+# Сид уровня дня: один и тот же у всех игроков в этот день
+def daily_seed(day=None):
+    day = day or time.localtime()
+    return day.tm_year * 10000 + day.tm_mon * 100 + day.tm_mday
+
+# Снимок состояния игры для поиска вперёд и отката: скаляры в двух
+# упакованных массивах (целые и дробные, порядок — SNAPSHOT_INTS и
+# SNAPSHOT_FLOATS), объекты каждого вида и генератор уровня — массивы целых,
+# отметки выполненных миссий — массив байтов, плюс состояние rng.
+# Снимается и восстанавливается за микросекунды, без копирования Rect и словарей.
+SNAPSHOT_INTS = (
+    "ticks", "bg_timer", "bg_index", "game_over", "paused", "show_improvement_menu", "moving",
+    "bird.health", "bird.lives", "bird.immunity", "bird.shield", "bird.shield_duration",
+    "bird.magnet_duration", "bird.score", "bird.coins", "bird.rage_mode", "bird.rage_timer",
+    "weather.type", "weather.timer",
+    "missions.coins", "missions.pipes", "missions.hearts",
+    "magnet.level", "magnet.cost", "shield.level", "shield.cost", "jump.level", "jump.cost",
+    "pipes.spawned", "coins.spawned", "powerups.spawned", "hearts.spawned", "enemies.spawned",
+)
+SNAPSHOT_FLOATS = ("bird.y", "bird.prev_y", "bird.vel", "bird.jump_power", "weather.wind")
+SNAPSHOT_GROUPS = ("pipes", "coins", "powerups", "hearts", "enemies")
+
+class Snapshot:
+    __slots__ = ("ints", "floats", "groups", "level", "missions", "rng_state")
+
+    def __init__(self, ints, floats, groups, level, missions, rng_state):
+        self.ints = ints
+        self.floats = floats
+        self.groups = groups
+        self.level = level
+        self.missions = missions
+        self.rng_state = rng_state
+
+    # Размер упакованных данных в байтах (без состояния rng)
+    @property
+    def nbytes(self):
+        arrays = (self.ints, self.floats, self.level, self.missions, *self.groups)
+        return sum(len(a) * a.itemsize for a in arrays)
+
+    # Отличия от другого снимка: {поле: (было, стало)}; для объектов —
+    # {вид: (появились, исчезли, изменились)} по номерам появления seq
+    def diff(self, other):
+        changes = {}
+        for names, mine, theirs in ((SNAPSHOT_INTS, self.ints, other.ints),
+                                    (SNAPSHOT_FLOATS, self.floats, other.floats)):
+            if mine != theirs:
+                for name, a, b in zip(names, mine, theirs):
+                    if a != b:
+                        changes[name] = (a, b)
+        if self.level != other.level:
+            changes["level"] = (self.level[0], other.level[0])
+        if self.missions != other.missions:
+            changes["missions"] = [k for k, (a, b) in enumerate(zip(self.missions, other.missions)) if a != b]
+        for name, cls, mine, theirs in zip(SNAPSHOT_GROUPS, (Pipe, Coin, PowerUp, Heart, Enemy),
+                                           self.groups, other.groups):
+            if mine == theirs:
+                continue
+            size = cls.PACK
+            old = {mine[i + size - 1]: mine[i:i + size] for i in range(0, len(mine), size)}
+            new = {theirs[i + size - 1]: theirs[i:i + size] for i in range(0, len(theirs), size)}
+            changes[name] = (
+                sorted(new.keys() - old.keys()),
+                sorted(old.keys() - new.keys()),
+                sorted(seq for seq in old.keys() & new.keys() if old[seq] != new[seq]),
+            )
+        return changes
+
+# Состояние игры: вся логика без экрана и часов, один вызов step() — один тик.
+# С seed все случайности берутся из своего random.Random, и игра полностью
+# определяется сидом и последовательностью действий; без seed — из модуля random.
+class GameState:
+    def __init__(self, difficulty, bird_color, load_save=False, seed=None, save_data=None, daily=None):
+        self.difficulty = difficulty
+        self.daily = daily  # сид дня для ежедневных миссий (daily_seed) или None
+        self.bird_color = bird_color
+        self.load_save = load_save
+        self.seed = seed
+        self.save_data = save_data
+        self.speed = DIFFICULTIES[difficulty]["pipe_speed"]
+        # Без seed уровень всё равно задаётся сидом — случайным
+        level_seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.level = LevelStream(level_seed, DIFFICULTIES[difficulty]["enemy_rate"])
+        self.pipes = EntityList(Pipe, PIPE_WIDTH, attrgetter("x"))
+        self.coins = EntityList(Coin, 25)
+        self.powerups = EntityList(PowerUp, 25)
+        self.hearts = EntityList(Heart, 30)
+        self.enemies = EntityList(Enemy, 40)
+        self.bg_timer = 0
+        self.bg_index = 0
+        self.paused = False
+        self.show_improvement_menu = False
+        self.ticks = 0
+        self.moving = False  # двигался ли мир на последнем тике (для интерполяции)
+        self.reset()
+
+    # Новая игра: уровень и погода заново с того же сида, так что каждый
+    # забег воспроизводится по state.seed. Фон (не влияет на игру) не сбрасывается.
+    def reset(self):
+        self.rng = random.Random(self.seed) if self.seed is not None else random
+        self.level.restart()
+        self.bird = Bird(self.bird_color)
+        self.pipes.clear(); self.coins.clear(); self.powerups.clear(); self.hearts.clear(); self.enemies.clear()
+        self.improvements_manager = ImprovementsManager(self.bird)
+        self.missions_manager = MissionsManager(self.bird, self.daily)
+        self.weather = Weather(self.rng)
+        self.save_manager = SaveManager(self.bird, self.missions_manager, self.improvements_manager)
+        # Сохранение читается один раз за сессию и применяется при каждом рестарте
+        if self.load_save and self.save_data is None:
+            self.save_data = self.save_manager.read() or {}
+        if self.save_data:
+            self.save_manager.apply(self.save_data)
+        self.game_over = False
+
+    # Хэш всего, что влияет на дальнейшую игру (для проверки повторов)
+    def state_hash(self):
+        b = self.bird
+        data = (
+            self.ticks, self.level.tick, self.bg_timer, self.bg_index, self.game_over, self.paused,
+            self.show_improvement_menu,
+            float(b.y), float(b.vel), b.health, b.lives, b.immunity, b.shield, b.shield_duration,
+            b.magnet_duration, b.score, b.coins, float(b.jump_power),
+            self.weather.type, self.weather.timer,
+            tuple(m["completed"] for m in self.missions_manager.missions),
+            tuple(self.missions_manager.counters.values()),
+            tuple(v["level"] for v in self.improvements_manager.improvements.values()),
+            tuple((p.x, p.top, p.scored) for p in self.pipes),
+            tuple((c.rect.x, c.rect.y, c.collected) for c in self.coins),
+            tuple((u.rect.x, u.rect.y, u.kind) for u in self.powerups),
+            tuple((h.rect.x, h.rect.y) for h in self.hearts),
+            tuple((e.rect.x, e.rect.y, e.speed) for e in self.enemies),
+        )
+        return int.from_bytes(hashlib.blake2b(repr(data).encode(), digest_size=8).digest(), "little")
+
+    def snapshot(self):
+        b = self.bird
+        w = self.weather
+        mm = self.missions_manager
+        imp = self.improvements_manager.improvements
+        counters = mm.counters
+        ints = array("q", (
+            self.ticks, self.bg_timer, self.bg_index, self.game_over, self.paused, self.show_improvement_menu, self.moving,
+            b.health, b.lives, b.immunity, b.shield, b.shield_duration,
+            b.magnet_duration, b.score, b.coins, b.rage_mode, b.rage_timer,
+            WEATHER_TYPES.index(w.type), w.timer,
+            counters["coins"], counters["pipes"], counters["hearts"],
+            imp["magnet_duration"]["level"], imp["magnet_duration"]["cost"],
+            imp["shield_duration"]["level"], imp["shield_duration"]["cost"],
+            imp["jump_power"]["level"], imp["jump_power"]["cost"],
+            self.pipes.spawned, self.coins.spawned, self.powerups.spawned, self.hearts.spawned, self.enemies.spawned,
+        ))
+        floats = array("d", (b.y, b.prev_y, b.vel, b.jump_power, w.wind))
+        groups = (self.pipes.pack(), self.coins.pack(), self.powerups.pack(), self.hearts.pack(), self.enemies.pack())
+        missions = array("b", [m["completed"] for m in mm.missions])
+        return Snapshot(ints, floats, groups, self.level.pack(), missions, self.rng.getstate())
+
+    # Восстановление из snapshot(). Без сида rng — общий модуль random,
+    # его состояние тоже откатывается.
+    def restore(self, snap):
+        b = self.bird
+        w = self.weather
+        mm = self.missions_manager
+        imp = self.improvements_manager.improvements
+        (self.ticks, self.bg_timer, self.bg_index, game_over, paused, show_menu, moving,
+         b.health, b.lives, b.immunity, shield, b.shield_duration,
+         b.magnet_duration, b.score, b.coins, rage_mode, b.rage_timer,
+         weather_type, w.timer,
+         coins_counter, pipes_counter, hearts_counter,
+         imp["magnet_duration"]["level"], imp["magnet_duration"]["cost"],
+         imp["shield_duration"]["level"], imp["shield_duration"]["cost"],
+         imp["jump_power"]["level"], imp["jump_power"]["cost"],
+         pipes, coins, powerups, hearts, enemies) = snap.ints
+        self.game_over = bool(game_over)
+        self.paused = bool(paused)
+        self.show_improvement_menu = bool(show_menu)
+        self.moving = bool(moving)
+        b.shield = bool(shield)
+        b.rage_mode = bool(rage_mode)
+        w.type = WEATHER_TYPES[weather_type]
+        mm.counters.update(coins=coins_counter, pipes=pipes_counter, hearts=hearts_counter)
+        if array("b", [m["completed"] for m in mm.missions]) != snap.missions:
+            for m, done in zip(mm.missions, snap.missions):
+                m["completed"] = bool(done)
+            mm.reindex()
+        else:
+            mm.version += 1
+        b.y, b.prev_y, b.vel, b.jump_power, w.wind = snap.floats
+        b.rect.y = int(b.y)
+        for group, data, spawned in zip((self.pipes, self.coins, self.powerups, self.hearts, self.enemies),
+                                        snap.groups, (pipes, coins, powerups, hearts, enemies)):
+            group.restore(data, spawned)
+        self.level.unpack(snap.level)
+        self.rng.setstate(snap.rng_state)
+
+    @property
+    def running(self):
+        return not self.paused and not self.game_over and not self.show_improvement_menu
+
+    def hurt_bird(self):
+        if self.bird.hurt():
+            self.game_over = True
+
+    def step(self, action=0):
+        if action & PAUSE:
+            self.paused = not self.paused
+        if action & MENU:
+            self.show_improvement_menu = not self.show_improvement_menu
+        if self.show_improvement_menu:
+            if action & BUY_MAGNET:
+                self.improvements_manager.buy("magnet_duration")
+            if action & BUY_SHIELD:
+                self.improvements_manager.buy("shield_duration")
+            if action & BUY_JUMP:
+                self.improvements_manager.buy("jump_power")
+        if action & JUMP:
+            if self.game_over:
+                self.reset()
+            elif not self.paused and not self.show_improvement_menu:
+                self.bird.jump()
+
+        self.moving = self.running
+        if not self.running:
+            return
+        self.ticks += 1
+        lap = profiler.lap if profiler.enabled else None
+        self.spawn()
+        if lap:
+            lap("spawn")
+
+        bird = self.bird
+        speed = self.speed
+        missions_manager = self.missions_manager
+
+        self.weather.update()
+        self.weather.apply_effect(bird)
+        if lap:
+            lap("weather")
+
+        bird.update()
+
+        # Падение вниз
+        if bird.y > HEIGHT:
+            if bird.immunity == 0 and not bird.shield:
+                self.hurt_bird()
+            bird.y = HEIGHT - bird.height
+            bird.vel = 0
+            bird.rect.y = int(bird.y)
+        if lap:
+            lap("bird")
+
+        # Сдвиг, уход за экран и очки считаются для всех объектов,
+        # а столкновения — только пары из широкой фазы (candidate_pairs)
+        rect = bird.rect
+        left, right = rect.left, rect.right
+        bands = rect_bands((rect,))
+
+        # Пайпы
+        pipes = self.pipes
+        for pipe in pipes:
+            pipe.update(speed)
+            if pipe.x + pipe.width < 0:
+                pipes.remove(pipe)
+            if not pipe.scored and pipe.x + pipe.width < bird.x:
+                bird.score += 1
+                pipe.scored = True
+                missions_manager.notify("pipes", bird.score)
+        for pipe in pipes.query(left, right):
+            if rect.colliderect(pipe.rect_top) or rect.colliderect(pipe.rect_bottom):
+                if not bird.shield and bird.immunity == 0:
+                    self.hurt_bird()
+        if lap:
+            lap("pipes")
+
+        # Монеты
+        coins = self.coins
+        for coin in coins:
+            coin.update(speed)
+            if coin.rect.right < 0:
+                coins.remove(coin)
+        for _, coin in candidate_pairs((rect,), coins, bands):
+            if not coin.collected:
+                coin.collected = True
+                bird.coins += 1
+                missions_manager.notify("coins", bird.coins)
+        if lap:
+            lap("coins")
+
+        # PowerUps
+        powerups = self.powerups
+        for pu in powerups:
+            pu.update(speed)
+            if pu.rect.right < 0:
+                powerups.remove(pu)
+        for _, pu in candidate_pairs((rect,), powerups, bands):
+            if pu.kind == "shield":
+                bird.shield = True
+                bird.shield_duration = self.improvements_manager.improvements["shield_duration"]["level"] * 300
+            else:
+                bird.magnet_duration = self.improvements_manager.improvements["magnet_duration"]["level"] * 300
+            powerups.remove(pu)
+        if lap:
+            lap("powerups")
+
+        # Сердца
+        hearts = self.hearts
+        for heart in hearts:
+            heart.update(speed)
+            if heart.rect.right < 0:
+                hearts.remove(heart)
+        for _, heart in candidate_pairs((rect,), hearts, bands):
+            if not heart.collected:
+                heart.collected = True
+                bird.lives = min(bird.lives + 1, 5)
+                hearts.remove(heart)
+                missions_manager.notify("hearts", missions_manager.counters["hearts"] + 1)
+        if lap:
+            lap("hearts")
+
+        # Враги летят с разной скоростью и не отсортированы по x; для одной
+        # птицы пересортировка дороже прямой проверки (стая — XIndex, см. Flock)
+        enemies = self.enemies
+        for enemy in enemies:
+            enemy.update()
+            if enemy.rect.right < 0:
+                enemies.remove(enemy)
+            elif rect.colliderect(enemy.rect):
+                if not bird.shield and bird.immunity == 0:
+                    enemies.remove(enemy)
+                    self.hurt_bird()
+        if lap:
+            lap("enemies")
+
+        for group in (pipes, coins, powerups, hearts, enemies):
+            group.sweep()
+        if lap:
+            lap("sweep")
+
+    # Появление новых объектов: события генератора уровня на этот тик
+    def spawn(self):
+        for tick, kind, x, y, extra in self.level.advance():
+            if kind == SPAWN_PIPE:
+                self.pipes.spawn(x, y, bool(extra), self.level.gap)
+            elif kind == SPAWN_COIN:
+                self.coins.spawn(x, y)
+            elif kind == SPAWN_POWERUP:
+                self.powerups.spawn(x, y, "shield" if extra else "magnet")
+            elif kind == SPAWN_HEART:
+                self.hearts.spawn(x, y)
+            else:
+                self.enemies.spawn(x, y, extra)
+
+        self.bg_timer += 1
+        if self.bg_timer > 600:
+            self.bg_timer = 0
+            self.bg_index = (self.bg_index + 1) % len(BG_COLORS)
+
+# Много птиц в одном мире (призраки, популяции ботов, гонка для зрителей):
+# общие поток уровня, трубы, монеты, враги и погода, у каждой птицы свои
+# здоровье, жизни, иммунитет, улучшения и миссии. Подобранное и врезавшиеся
+# враги пропадают только для той птицы, что их взяла (множество taken), так
+# что птица с теми же действиями играет ровно как в GameState с тем же сидом.
+# Мёртвые птицы замирают; конец игры — когда не осталось живых.
+class Flock:
+    def __init__(self, difficulty, n, seed, daily=None, colors=RAINBOW_COLORS):
+        self.difficulty = difficulty
+        self.n = n
+        self.seed = seed
+        self.daily = daily
+        self.colors = colors
+        self.speed = DIFFICULTIES[difficulty]["pipe_speed"]
+        self.level = LevelStream(seed, DIFFICULTIES[difficulty]["enemy_rate"])
+        self.pipes = EntityList(Pipe, PIPE_WIDTH, attrgetter("x"))
+        self.coins = EntityList(Coin, 25)
+        self.powerups = EntityList(PowerUp, 25)
+        self.hearts = EntityList(Heart, 30)
+        self.enemies = EntityList(Enemy, 40)
+        self.enemy_index = XIndex(40)
+        self.bg_timer = 0
+        self.bg_index = 0
+        self.paused = False
+        self.ticks = 0
+        self.moving = False
+        self.reset()
+
+    def reset(self):
+        n = self.n
+        self.rng = random.Random(self.seed)
+        self.level.restart()
+        self.birds = [Bird(self.colors[i % len(self.colors)]) for i in range(n)]
+        self.improvements = [ImprovementsManager(b) for b in self.birds]
+        self.missions = [MissionsManager(b, self.daily) for b in self.birds]
+        self.taken = [set() for _ in range(n)]
+        self.live = list(range(n))
+        self.died_at = [None] * n
+        self.deaths = False
+        self.pipes.clear(); self.coins.clear(); self.powerups.clear(); self.hearts.clear(); self.enemies.clear()
+        self.weather = Weather(self.rng)
+        self.game_over = False
+
+    @property
+    def running(self):
+        return not self.paused and not self.game_over
+
+    # Появление объектов и смена фона — как в одиночной игре
+    spawn = GameState.spawn
+
+    def hurt(self, i):
+        if self.birds[i].hurt() and self.died_at[i] is None:
+            self.died_at[i] = self.ticks
+            self.deaths = True
+
+    # actions — по действию на птицу: JUMP и BUY_* (покупка сразу, без меню)
+    def step(self, actions):
+        self.moving = self.running
+        if not self.running:
+            return
+        self.ticks += 1
+        self.spawn()
+        self.weather.update()
+
+        birds = self.birds
+        live = self.live
+        weather = self.weather
+        for i in live:
+            bird = birds[i]
+            action = actions[i]
+            if action & (BUY_MAGNET | BUY_SHIELD | BUY_JUMP):
+                manager = self.improvements[i]
+                if action & BUY_MAGNET:
+                    manager.buy("magnet_duration")
+                if action & BUY_SHIELD:
+                    manager.buy("shield_duration")
+                if action & BUY_JUMP:
+                    manager.buy("jump_power")
+            if action & JUMP:
+                bird.jump()
+            weather.apply_effect(bird)
+            bird.update()
+            if bird.y > HEIGHT:
+                if bird.immunity == 0 and not bird.shield:
+                    self.hurt(i)
+                bird.y = HEIGHT - bird.height
+                bird.vel = 0
+                bird.rect.y = int(bird.y)
+        if not live:
+            return
+
+        # Широкая фаза общая с GameState: птицы стаи — одна полоса по x
+        # (rect_bands), пары птица-объект дают candidate_pairs
+        rects = [birds[i].rect for i in live]
+        bands = rect_bands(rects)
+        first = birds[live[0]]
+        speed = self.speed
+        taken = self.taken
+        missions = self.missions
+
+        pipes = self.pipes
+        for pipe in pipes:
+            pipe.update(speed)
+            if pipe.x + pipe.width < 0:
+                pipes.remove(pipe)
+            if not pipe.scored and pipe.x + pipe.width < first.x:
+                pipe.scored = True
+                for i in live:
+                    birds[i].score += 1
+                    missions[i].notify("pipes", birds[i].score)
+        # У трубы две части без общего rect — полосы проверяются напрямую
+        for band in bands:
+            left, right = band[0], band[1]
+            for pipe in pipes.query(left, right):
+                if pipe.x >= right or pipe.x + pipe.width <= left:
+                    continue
+                for k in (*band_members(band, 0, pipe.top), *band_members(band, pipe.bottom, pipe.bottom + HEIGHT)):
+                    bird = birds[live[k]]
+                    if not bird.shield and bird.immunity == 0:
+                        self.hurt(live[k])
+
+        coins = self.coins
+        for coin in coins:
+            coin.update(speed)
+            if coin.rect.right < 0:
+                coins.remove(coin)
+        for k, coin in candidate_pairs(rects, coins, bands):
+            i = live[k]
+            key = coin.seq << 3 | SPAWN_COIN
+            if key not in taken[i]:
+                taken[i].add(key)
+                bird = birds[i]
+                bird.coins += 1
+                missions[i].notify("coins", bird.coins)
+
+        powerups = self.powerups
+        for pu in powerups:
+            pu.update(speed)
+            if pu.rect.right < 0:
+                powerups.remove(pu)
+        for k, pu in candidate_pairs(rects, powerups, bands):
+            i = live[k]
+            key = pu.seq << 3 | SPAWN_POWERUP
+            if key not in taken[i]:
+                taken[i].add(key)
+                bird = birds[i]
+                levels = self.improvements[i].improvements
+                if pu.kind == "shield":
+                    bird.shield = True
+                    bird.shield_duration = levels["shield_duration"]["level"] * 300
+                else:
+                    bird.magnet_duration = levels["magnet_duration"]["level"] * 300
+
+        hearts = self.hearts
+        for heart in hearts:
+            heart.update(speed)
+            if heart.rect.right < 0:
+                hearts.remove(heart)
+        for k, heart in candidate_pairs(rects, hearts, bands):
+            i = live[k]
+            key = heart.seq << 3 | SPAWN_HEART
+            if key not in taken[i]:
+                taken[i].add(key)
+                bird = birds[i]
+                bird.lives = min(bird.lives + 1, 5)
+                missions[i].notify("hearts", missions[i].counters["hearts"] + 1)
+
+        enemies = self.enemies
+        for enemy in enemies:
+            enemy.update()
+            if enemy.rect.right < 0:
+                enemies.remove(enemy)
+        self.enemy_index.build(enemies.items)
+        for k, enemy in candidate_pairs(rects, self.enemy_index, bands):
+            i = live[k]
+            bird = birds[i]
+            key = enemy.seq << 3 | SPAWN_ENEMY
+            if not bird.shield and bird.immunity == 0 and key not in taken[i]:
+                taken[i].add(key)
+                self.hurt(i)
+
+        groups = (pipes, coins, powerups, hearts, enemies)
+        for group in groups:
+            group.sweep()
+        # Взятое уже ушедшими за экран объектами больше не нужно
+        if self.ticks % CHUNK_TICKS == 0:
+            floor = [group[0].seq if len(group) else group.spawned for group in groups]
+            for keys in taken:
+                if keys:
+                    keys.difference_update([k for k in keys if k >> 3 < floor[k & 7]])
+
+        if self.deaths:
+            self.deaths = False
+            self.live = [i for i in live if self.died_at[i] is None]
+            self.game_over = not self.live
+
+    # Итоги по птицам: (очки, монеты, жизни, тик смерти или None)
+    def results(self):
+        return [(b.score, b.coins, b.lives, died) for b, died in zip(self.birds, self.died_at)]
+
+# Запись игры: заголовок (JSON: сид, сложность, цвет, сохранение) и поток
+# записей "тип, пропуск тиков (varint), данные". Пишутся только тики с
+# действием, плюс хэш состояния каждые checkpoint тиков и метка конца.
+REPLAY_MAGIC = b"FLRP"
+REPLAY_VERSION = 4
+REC_ACTION, REC_HASH, REC_END = 1, 2, 3
+
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+class InputRecorder:
+    def __init__(self, path, state, checkpoint=600):
+        self.file = open(path, "wb")
+        self.checkpoint = checkpoint
+        self.tick = 0
+        self.last = 0
+        header = json.dumps({
+            "seed": state.seed,
+            "difficulty": state.difficulty,
+            "color": list(state.bird_color),
+            "save": state.save_data,
+            "daily": state.daily,
+            "checkpoint": checkpoint,
+        }, ensure_ascii=False).encode()
+        self.file.write(REPLAY_MAGIC + struct.pack("<BI", REPLAY_VERSION, len(header)) + header)
+
+    def _write(self, kind, payload=b""):
+        self.file.write(bytes([kind]) + _varint(self.tick - self.last) + payload)
+        self.last = self.tick
+
+    # Вызывается после каждого state.step(action)
+    def record(self, action, state):
+        self.tick += 1
+        if action:
+            self._write(REC_ACTION, bytes([action]))
+        if self.tick % self.checkpoint == 0:
+            self._write(REC_HASH, struct.pack("<Q", state.state_hash()))
+
+    def close(self):
+        if self.file:
+            self._write(REC_END)
+            self.file.close()
+            self.file = None
+
+# Чтение записи: (заголовок, {тик: действие}, {тик: хэш}, число тиков)
+def read_replay(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != REPLAY_MAGIC:
+        raise ValueError(f"{path}: не файл записи")
+    version, size = struct.unpack_from("<BI", data, 4)
+    if version != REPLAY_VERSION:
+        raise ValueError(f"{path}: версия записи {version}, ожидается {REPLAY_VERSION}")
+    pos = 9
+    header = json.loads(data[pos:pos + size])
+    pos += size
+    actions, hashes = {}, {}
+    tick = 0
+    while pos < len(data):
+        kind = data[pos]
+        pos += 1
+        delta = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            delta |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                break
+        tick += delta
+        if kind == REC_ACTION:
+            actions[tick] = data[pos]
+            pos += 1
+        elif kind == REC_HASH:
+            hashes[tick] = struct.unpack_from("<Q", data, pos)[0]
+            pos += 8
+        elif kind == REC_END:
+            break
+    return header, actions, hashes, tick
+
+# Автопилот: каждый тик выбирает прыжок или нет поиском по лучу (beam search)
+# на horizon тиков вперёд. Траектории птицы считаются по тем же формулам, что
+# Bird.update/Bird.jump и ветер Weather; трубы и враги сдвигаются на свою
+# скорость. Стоимость пути — удары (с учётом иммунитета и щита) и отклонение
+# от середины ближайшего просвета. Поиск укладывается в budget мс: по
+# истечении времени решение берётся из уже просчитанной части горизонта.
+PILOT_HIT = 1000.0
+
+class Autopilot:
+    def __init__(self, budget_ms=2.0, horizon=40, beam=12):
+        self.budget = budget_ms / 1000
+        self.horizon = horizon
+        self.beam = beam
+        self.latency = deque(maxlen=10000)
+        self.decisions = 0
+        self.overruns = 0
+        self.truncated = 0
+
+    # Препятствия по тикам вперёд: ускорение, просвет трубы, полосы врагов, цель по y
+    def _plan(self, state, horizon):
+        bird = state.bird
+        weather = state.weather
+        speed = state.speed
+        left, right = bird.x, bird.x + bird.width
+        pipes = [(p.x, p.top, p.bottom, p.width) for p in state.pipes if p.x + p.width >= left]
+        enemies = [(e.rect.x, e.rect.y, e.speed) for e in state.enemies if e.rect.right >= left]
+        ticks = []
+        for t in range(1, horizon + 1):
+            timer = weather.timer + t
+            if weather.type == "wind":
+                wind = WIND_FORCE if (timer // WIND_GUST) % 2 else -WIND_FORCE
+            else:
+                wind = 0.0
+            gap = None
+            target = HEIGHT // 2 - bird.height // 2
+            for x, top, bottom, width in pipes:
+                x -= speed * t
+                if x + width >= left:
+                    if gap is None and x < right:
+                        gap = (top, bottom - bird.height)
+                    target = (top + bottom - bird.height) // 2
+                    break
+            bands = [(y - bird.height, y + 40) for x, y, s in enemies
+                     if x - s * t < right and x - s * t + 40 > left]
+            ticks.append((wind + bird.gravity, gap, bands, target))
+        return ticks
+
+    def decide(self, state):
+        if state.game_over:
+            return JUMP
+        if not state.running:
+            return 0
+        start = time.perf_counter()
+        deadline = start + self.budget
+        bird = state.bird
+        floor = HEIGHT - bird.height
+        jump_power = bird.jump_power
+        safe = max(bird.immunity, bird.shield_duration if bird.shield else 0)
+        ticks = self._plan(state, self.horizon)
+
+        # Узел: (стоимость, y, скорость, первое действие, защищён до тика)
+        beam = [(0.0, bird.y, bird.vel, 0, safe)]
+        first = True
+        for t, (accel, gap, bands, target) in enumerate(ticks, 1):
+            best = {}
+            for cost, y, vel, action, guard in beam:
+                for jump in (0, JUMP):
+                    v = (jump_power if jump else vel) + accel
+                    ny = y + v
+                    c = cost
+                    g = guard
+                    if ny > HEIGHT:
+                        if t >= g:
+                            c += PILOT_HIT
+                            g = t + 120
+                        ny = floor
+                        v = 0
+                    ry = int(ny)
+                    if t >= g:
+                        hit = gap is not None and ry > -bird.height and (ry < gap[0] or ry > gap[1])
+                        if not hit:
+                            for lo, hi in bands:
+                                if lo < ry < hi:
+                                    hit = True
+                                    break
+                        if hit:
+                            c += PILOT_HIT
+                            g = t + 120
+                    c += abs(ry - target) * 0.01
+                    key = (ry >> 1, int(v))
+                    node = best.get(key)
+                    if node is None or c < node[0]:
+                        best[key] = (c, ny, v, jump if first else action, g)
+            beam = sorted(best.values())[:self.beam]
+            first = False
+            # Следующий шаг горизонта в бюджет уже не уложится
+            now = time.perf_counter()
+            if now + (now - start) / t > deadline:
+                if t < len(ticks):
+                    self.truncated += 1
+                break
+        action = beam[0][3]
+
+        elapsed = time.perf_counter() - start
+        self.latency.append(elapsed * 1000)
+        self.decisions += 1
+        if elapsed > self.budget:
+            self.overruns += 1
+        return action
+
+    # Задержка решения, мс: p50/p95/p99/max по последним решениям
+    def report(self):
+        data = sorted(self.latency)
+        if not data:
+            return {"decisions": 0}
+        last = len(data) - 1
+        stats = {f"p{int(q * 100)}": round(data[min(last, int(q * len(data)))], 3) for q in (0.5, 0.95, 0.99)}
+        return {"decisions": self.decisions, **stats, "max": round(data[-1], 3),
+                "over_budget": self.overruns, "truncated": self.truncated}
+
+# Пары (спрайт, позиция) всех объектов мира; lag — доля тика до интерполяции
+def world_blit_items(state, lag, out):
+    dx = round(state.speed * lag)
+    for group in (state.pipes, state.coins, state.powerups, state.hearts):
+        for obj in group:
+            obj.blit_items(out, dx)
+    for enemy in state.enemies:
+        enemy.blit_items(out, round(enemy.speed * lag))
+    return out
+
+# Отрисовка состояния игры на экран; возвращает прямоугольники,
+# в которые что-то нарисовано поверх фона. alpha — доля пути от
+# предыдущего тика к текущему (0..1), позиции интерполируются.
+def draw_game(state, background=True, alpha=1.0):
+    if background:
+        screen.fill(BG_COLORS[state.bg_index])
+    rects = []
+    if state.running:
+        lag = 1.0 - alpha if state.moving else 0.0
+        # Все объекты мира — одним вызовом blits
+        rects += screen.blits(world_blit_items(state, lag, []))
+        profiler.lap("world")
+
+        # HUD
+        bird = state.bird
+        rects.append(draw_value("Очки: ", bird.score, 10, 10))
+        rects.append(draw_value("Монеты: ", bird.coins, 10, 40))
+        rects.append(draw_value("Жизни: ", bird.lives, 10, 70))
+        rects.append(draw_value("Здоровье: ", bird.health, 10, 100))
+        rects.append(draw_text(f"Погода: {state.weather.type}", 10, 130))
+        rects.append(draw_health_bar(120, 100, bird.health))
+        rects += draw_mission_progress(state.missions_manager)
+        profiler.lap("hud")
+
+        rects += state.weather.draw(state.ticks)
+        profiler.lap("weather_draw")
+        rects += bird.draw(round((bird.prev_y - bird.y) * lag))
+        profiler.lap("bird_draw")
+
+    elif state.paused:
+        draw_text("Пауза. Нажмите P для продолжения.", WIDTH // 2 - 150, HEIGHT // 2)
+    elif state.show_improvement_menu:
+        state.improvements_manager.draw_menu()
+        draw_text("Нажмите P для паузы, M для выхода", 50, HEIGHT - 40)
+    else:
+        draw_text("Игра окончена!", WIDTH // 2 - 70, HEIGHT // 2 - 30, (255, 0, 0))
+        draw_text("Нажмите SPACE для новой игры", WIDTH // 2 - 140, HEIGHT // 2 + 10, (255, 0, 0))
+        best = leaderboard.top(state.difficulty, 5)
+        if best:
+            y = HEIGHT // 2 + 60
+            draw_text(f"Рекорды ({state.difficulty}):", WIDTH // 2 - 140, y)
+            for i, (name, score, coins, seed, duration) in enumerate(best, 1):
+                y += 25
+                draw_text(f"{i}. {name} — {score}", WIDTH // 2 - 120, y)
+    return rects
+
+CROWD_KEY = (255, 0, 255)  # прозрачный цвет слоя стаи, в палитре птиц его нет
+
+# Стая одним blit: у всех птиц стаи один x и одна ширина, так что вместе
+# они — столбец шириной в птицу. Цвет каждой строки (сверху — птица,
+# нарисованная последней) собирается срезами в массиве NumPy, переносится
+# в поверхность через surfarray и выводится одним blit. Щиты и магниты
+# рисуются отдельно и только у птиц, у которых они есть, — всегда поверх
+# всей стаи. Поэтому там, где птицы перекрываются, картинка не совпадает
+# с поочерёдной отрисовкой птиц: эффект не закрывается птицами над ним.
+class CrowdLayer:
+    def __init__(self):
+        self.surface = None
+        self.colors = {}
+
+    def _init(self, width):
+        import numpy as np
+        self.surface = pygame.Surface((width, HEIGHT)).convert()
+        self.surface.set_colorkey(CROWD_KEY)
+        self.key = self.surface.map_rgb(CROWD_KEY)
+        self.column = np.empty(HEIGHT, dtype=np.uint32)
+        self.colors = {}
+
+    def draw(self, birds, live, lag):
+        if not live:
+            return []
+        first = birds[live[0]]
+        if self.surface is None or self.surface.get_width() != first.width:
+            self._init(first.width)
+        column = self.column
+        column.fill(self.key)
+        colors = self.colors
+        height = first.height
+        effects = []
+        for i in live:
+            bird = birds[i]
+            color = BIRD_IMMUNITY_COLOR if bird.immunity > 0 else bird.color
+            if bird.rage_mode:
+                color = BIRD_RAGE_COLOR
+            value = colors.get(color)
+            if value is None:
+                value = colors[color] = self.surface.map_rgb(color)
+            dy = round((bird.prev_y - bird.y) * lag)
+            y = bird.rect.y + dy
+            column[max(y, 0):max(y + height, 0)] = value
+            if bird.shield or bird.magnet_duration > 0:
+                bird.effect_items(effects, bird.rect.move(0, dy))
+        pixels = pygame.surfarray.pixels2d(self.surface)
+        pixels[:] = column
+        del pixels
+        # Одинаковые щиты и магниты птиц на одной высоте — один раз
+        effects = list(dict.fromkeys((img, tuple(pos)) for img, pos in effects))
+        return [screen.blit(self.surface, (first.rect.x, 0))] + screen.blits(effects)
+
+crowd_layer = CrowdLayer()
+
+# Стая: мир, затем все живые птицы (у каждой свой цвет из colors стаи);
+# HUD — сколько живых и лучший счёт
+def draw_flock(flock, alpha=1.0):
+    screen.fill(BG_COLORS[flock.bg_index])
+    lag = 1.0 - alpha if flock.moving else 0.0
+    screen.blits(world_blit_items(flock, lag, []), doreturn=False)
+    flock.weather.draw(flock.ticks)
+    crowd_layer.draw(flock.birds, flock.live, lag)
+    best = max(flock.birds, key=attrgetter("score"))
+    draw_value("Живых: ", f"{len(flock.live)}/{flock.n}", 10, 10)
+    draw_value("Лучший счёт: ", best.score, 10, 40)
+    draw_text(f"Погода: {flock.weather.type}", 10, 70)
+    if flock.game_over:
+        draw_text("Все птицы выбыли", WIDTH // 2 - 80, HEIGHT // 2, (255, 0, 0))
+
+# Отрисовка "грязными прямоугольниками": стираются и отправляются на экран
+# только области, где объекты были в прошлом кадре и есть в этом.
+# Смена фона, туман и экраны меню/паузы рисуются целиком.
+class DirtyRenderer:
+    def __init__(self):
+        self.prev = None
+        self.bg_index = None
+        self.weather = None
+
+    def invalidate(self):
+        self.prev = None
+
+    # overlay — функция, которая рисует поверх кадра и возвращает прямоугольники
+    def render(self, state, alpha=1.0, overlay=None):
+        weather = state.weather.type
+        full = (
+            self.prev is None
+            or not state.running
+            or state.bg_index != self.bg_index
+            or weather == "fog"
+            or self.weather == "fog"
+        )
+        bg = BG_COLORS[state.bg_index]
+        if full:
+            screen.fill(bg)
+        else:
+            for rect in self.prev:
+                screen.fill(bg, rect)
+        rects = draw_game(state, background=False, alpha=alpha)
+        if overlay:
+            rects += overlay()
+            profiler.lap("overlay")
+        if full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.prev + rects)
+        self.prev = rects if state.running else None
+        self.bg_index = state.bg_index
+        self.weather = weather
+
+# Параметры командной строки
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Flappy Bird")
+    parser.add_argument("--text-glyphs", action="store_true",
+                        help="собирать числа в HUD из заранее отрисованных символов")
+    parser.add_argument("--rain-density", type=int, default=20,
+                        help="количество капель дождя")
+    parser.add_argument("--dirty", action="store_true",
+                        help="перерисовывать только изменившиеся области экрана")
+    parser.add_argument("--tick-rate", type=float, default=TICK_RATE,
+                        help="тиков симуляции в секунду; константы заданы в тиках, "
+                             "так что это ускоряет или замедляет всю игру")
+    parser.add_argument("--fps", type=int, default=60,
+                        help="ограничение кадров в секунду, 0 — без ограничения")
+    parser.add_argument("--max-catchup", type=int, default=MAX_CATCHUP,
+                        help="сколько тиков можно догнать за один кадр")
+    parser.add_argument("--profile", action="store_true",
+                        help="замерять время участков кадра (F3 — оверлей)")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="писать времена кадров в .csv или .jsonl")
+    parser.add_argument("--seed", type=int, help="сид игры (по умолчанию случайный)")
+    parser.add_argument("--daily", action="store_true",
+                        help="уровень дня: сид из сегодняшней даты, одинаковый у всех")
+    parser.add_argument("--record", metavar="PATH",
+                        help="записывать ввод для повтора (см. replay.py)")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="игра играет сама (можно включить и в меню клавишей TAB)")
+    parser.add_argument("--autopilot-budget", type=float, default=2.0, metavar="MS",
+                        help="время на решение автопилота за тик, мс")
+    parser.add_argument("--capture", metavar="PATH",
+                        help="записывать кадры: кольцо кадров (см. capture.py) или видео .mp4/.mkv")
+    parser.add_argument("--capture-size", type=int, default=84,
+                        help="сторона записываемого кадра, 0 — полный размер экрана")
+    parser.add_argument("--capture-color", action="store_true",
+                        help="записывать цветные кадры вместо оттенков серого")
+    return parser.parse_args(argv)
 
 # Основная функция
 def main():
-    player_name, difficulty = main_menu()
+    args = parse_args()
+    init()
+    text_cache.glyphs = args.text_glyphs
+    sprites.bake_all()
+    startup_mark("sprites")
+    weather_fx.rain_density = args.rain_density
+    player_name, difficulty, autopilot = main_menu()
     bird_color = choose_color()
-    bird = Bird(bird_color)
-    pipes = []
-    coins = []
-    powerups = []
-    hearts = []
-    enemies = []
-
-    improvements_manager = ImprovementsManager(bird)
-    missions_manager = MissionsManager(bird)
-    weather = Weather()
-    save_manager = SaveManager(bird, missions_manager, improvements_manager)
-    save_manager.load()
-
-    speed = DIFFICULTIES[difficulty]["pipe_speed"]
-    enemy_rate = DIFFICULTIES[difficulty]["enemy_rate"]
-    pipe_timer = coin_timer = powerup_timer = heart_timer = enemy_timer = bg_timer = 0
-
-    bg_index = 0
-
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    if args.daily:
+        seed = daily_seed()
+    state = GameState(difficulty, bird_color, load_save=True, seed=seed, daily=daily_seed())
+    recorder = InputRecorder(args.record, state) if args.record else None
+    renderer = DirtyRenderer() if args.dirty else None
+    pilot = Autopilot(args.autopilot_budget) if args.autopilot or autopilot else None
+    leaderboard.open()
+    game_start = 0
     game_over = False
-    paused = False
-    show_improvement_menu = False
+    if args.profile or args.profile_out:
+        profiler.enable(args.profile_out)
+    overlay = None
+    capture = None
+    if args.capture:
+        # numpy нужен только для записи кадров
+        from capture import Capture
+        # Игре стопка наблюдений не нужна — пишем одиночные кадры
+        capture = Capture(screen, args.capture, args.capture_size or None, not args.capture_color,
+                          stack=1, fps=args.fps or 60)
+
+    # Фиксированный шаг: симуляция идёт тиками по tick_dt независимо от
+    # кадров, отрисовка интерполирует между двумя последними тиками
+    tick_dt = 1.0 / args.tick_rate
+    accumulator = 0.0
+    last = time.perf_counter()
+    # Нажатия копятся в очереди и применяются по одному на тик: два P
+    # за один кадр — пауза и снятие паузы, а не взаимное погашение
+    presses = deque()
+    next_autosave = AUTOSAVE_TICKS
 
     while True:
-        screen.fill(BG_COLORS[bg_index])
-
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                save_manager.save()
+                state.save_manager.save()
+                save_store.close()
+                leaderboard.close()
+                profiler.close()
+                if recorder:
+                    recorder.close()
+                if capture:
+                    capture.close()
+                    print(f"захват: {capture.frames} кадров, отброшено {capture.dropped}", file=sys.stderr)
+                if pilot:
+                    print("автопилот, задержка решения (мс):", pilot.report(), file=sys.stderr)
                 pygame.quit()
                 sys.exit()
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE and not game_over and not paused and not show_improvement_menu:
-                    bird.jump()
-                if event.key == pygame.K_p:
-                    paused = not paused
-                if event.key == pygame.K_m:
-                    show_improvement_menu = not show_improvement_menu
-                if show_improvement_menu:
-                    if event.key == pygame.K_1:
-                        improvements_manager.buy("magnet_duration")
-                    if event.key == pygame.K_2:
-                        improvements_manager.buy("shield_duration")
-                    if event.key == pygame.K_3:
-                        improvements_manager.buy("jump_power")
-                if game_over and event.key == pygame.K_SPACE:
-                    bird = Bird(bird_color)
-                    pipes.clear(); coins.clear(); powerups.clear(); hearts.clear(); enemies.clear()
-                    improvements_manager = ImprovementsManager(bird)
-                    missions_manager = MissionsManager(bird)
-                    weather = Weather()
-                    save_manager = SaveManager(bird, missions_manager, improvements_manager)
-                    save_manager.load()
-                    game_over = False
-
-        if not paused and not game_over and not show_improvement_menu:
-            pipe_timer += 1
-            coin_timer += 1
-            powerup_timer += 1
-            heart_timer += 1
-            enemy_timer += 1
-            bg_timer += 1
-
-            if pipe_timer > 90:
-                pipes.append(Pipe(WIDTH))
-                pipe_timer = 0
-
-            if coin_timer > 150:
-                coins.append(Coin(WIDTH, random.randint(50, HEIGHT - 50)))
-                coin_timer = 0
-
-            if powerup_timer > 600:
-                kind = random.choice(["shield", "magnet"])
-                powerups.append(PowerUp(WIDTH, random.randint(50, HEIGHT - 50), kind))
-                powerup_timer = 0
-
-            if heart_timer > 900:
-                hearts.append(Heart(WIDTH, random.randint(50, HEIGHT - 50)))
-                heart_timer = 0
-
-            if enemy_timer > enemy_rate:
-                enemies.append(Enemy(WIDTH, random.randint(50, HEIGHT - 50)))
-                enemy_timer = 0
-
-            if bg_timer > 600:
-                bg_timer = 0
-                bg_index = (bg_index + 1) % len(BG_COLORS)
-
-            weather.update()
-            weather.apply_effect(bird)
-
-            bird.update()
-
-            # Падение вниз
-            if bird.y > HEIGHT:
-                if bird.immunity == 0 and not bird.shield:
-                    bird.health -= 25
-                    bird.immunity = 120
-                    if bird.health <= 0:
-                        bird.lives -= 1
-                        bird.health = 100
-                        bird.immunity = 120
-                        if bird.lives <= 0:
-                            game_over = True
-                bird.y = HEIGHT - bird.height
-                bird.vel = 0
-                bird.rect.y = int(bird.y)
-
-            # Пайпы
-            for pipe in pipes[:]:
-                pipe.update(speed)
-                pipe.draw()
-                if pipe.x + pipe.width < 0:
-                    pipes.remove(pipe)
-                if bird.rect.colliderect(pipe.rect_top) or bird.rect.colliderect(pipe.rect_bottom):
-                    if not bird.shield and bird.immunity == 0:
-                        bird.health -= 25
-                        bird.immunity = 120
-                        if bird.health <= 0:
-                            bird.lives -= 1
-                            bird.health = 100
-                            bird.immunity = 120
-                            if bird.lives <= 0:
-                                game_over = True
-                if not pipe.scored and pipe.x + pipe.width < bird.x:
-                    bird.score += 1
-                    pipe.scored = True
-                    missions_manager.update()
-
-            # Монеты
-            for coin in coins[:]:
-                coin.update(speed)
-                coin.draw()
-                if coin.rect.right < 0:
-                    coins.remove(coin)
-                if not coin.collected and bird.rect.colliderect(coin.rect):
-                    coin.collected = True
-                    bird.coins += 1
-                    missions_manager.update()
-
-            # PowerUps
-            for pu in powerups[:]:
-                pu.update(speed)
-                pu.draw()
-                if pu.rect.right < 0:
-                    powerups.remove(pu)
-                if bird.rect.colliderect(pu.rect):
-                    if pu.kind == "shield":
-                        bird.shield = True
-                        bird.shield_duration = improvements_manager.improvements["shield_duration"]["level"] * 300
-                    else:
-                        bird.magnet_duration = improvements_manager.improvements["magnet_duration"]["level"] * 300
-                    powerups.remove(pu)
-
-            # Сердца
-            for heart in hearts[:]:
-                heart.update(speed)
-                heart.draw()
-                if heart.rect.right < 0:
-                    hearts.remove(heart)
-                if not heart.collected and bird.rect.colliderect(heart.rect):
-                    heart.collected = True
-                    bird.lives = min(bird.lives + 1, 5)
-                    missions_manager.hearts_collected += 1
-                    hearts.remove(heart)
-                    missions_manager.update()
-
-            # Враги
-            for enemy in enemies[:]:
-                enemy.update()
-                enemy.draw()
-                if enemy.rect.right < 0:
-                    enemies.remove(enemy)
-                if bird.rect.colliderect(enemy.rect):
-                    if not bird.shield and bird.immunity == 0:
-                        bird.health -= 25
-                        bird.immunity = 120
-                        enemies.remove(enemy)
-                        if bird.health <= 0:
-                            bird.lives -= 1
-                            bird.health = 100
-                            bird.immunity = 120
-                            if bird.lives <= 0:
-                                game_over = True
-
-            # HUD
-            draw_text(f"Очки: {bird.score}", 10, 10)
-            draw_text(f"Монеты: {bird.coins}", 10, 40)
-            draw_text(f"Жизни: {bird.lives}", 10, 70)
-            draw_text(f"Здоровье: {bird.health}", 10, 100)
-            draw_text(f"Погода: {weather.type}", 10, 130)
-            draw_health_bar(120, 100, bird.health)
-            draw_mission_progress(missions_manager)
-
-
-            weather.draw()
-            bird.draw()
-
-        elif paused:
-            draw_text("Пауза. Нажмите P для продолжения.", WIDTH // 2 - 150, HEIGHT // 2)
-        elif show_improvement_menu:
-            improvements_manager.draw_menu()
-            draw_text("Нажмите P для паузы, M для выхода", 50, HEIGHT - 40)
+                if event.key == pygame.K_F3 and profiler.enabled:
+                    profiler.overlay = not profiler.overlay
+                    overlay = profiler.draw_overlay if profiler.overlay else None
+                    if renderer:
+                        renderer.invalidate()
+                if event.key in KEY_ACTIONS:
+                    presses.append(KEY_ACTIONS[event.key])
+        profiler.lap("events")
+
+        now = time.perf_counter()
+        accumulator += now - last
+        last = now
+        ticks = 0
+        while accumulator >= tick_dt and ticks < args.max_catchup:
+            action = presses.popleft() if presses else 0
+            if pilot:
+                action |= pilot.decide(state)
+                profiler.lap("autopilot")
+            state.step(action)
+            if recorder:
+                recorder.record(action, state)
+                profiler.lap("record")
+            # Конец забега — в таблицу рекордов; новая игра — новый отсчёт.
+            # Проверка на каждом тике: за один кадр игра может и кончиться,
+            # и начаться заново (автопилот прыгает сразу после конца)
+            if state.game_over != game_over:
+                game_over = state.game_over
+                if game_over:
+                    bird = state.bird
+                    leaderboard.record(player_name, difficulty, bird.score, bird.coins, state.seed,
+                                       (state.ticks - game_start) / args.tick_rate)
+                else:
+                    game_start = state.ticks
+            accumulator -= tick_dt
+            ticks += 1
+        # Не успеваем — отбрасываем хвост, иначе отставание будет только расти
+        if accumulator >= tick_dt:
+            accumulator %= tick_dt
+        if state.ticks >= next_autosave:
+            state.save_manager.save()
+            next_autosave = state.ticks + AUTOSAVE_TICKS
+
+        alpha = accumulator / tick_dt
+        if renderer:
+            renderer.render(state, alpha, overlay)
         else:
-            draw_text("Игра окончена!", WIDTH // 2 - 70, HEIGHT // 2 - 30, (255, 0, 0))
-            draw_text("Нажмите SPACE для новой игры", WIDTH // 2 - 140, HEIGHT // 2 + 10, (255, 0, 0))
-
-        pygame.display.flip()
-        clock.tick(60)
+            draw_game(state, alpha=alpha)
+            if overlay:
+                overlay()
+                profiler.lap("overlay")
+            pygame.display.flip()
+        profiler.lap("display")
+        if capture:
+            capture.grab()
+            profiler.lap("capture")
+        clock.tick(args.fps)
+        profiler.lap("wait")
+        profiler.end_frame()
+
+startup_mark("import")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import main
+from main import GameState, read_replay
+
+
+# Расхождение повтора с записью
+class ReplayDivergence(Exception):
+    def __init__(self, tick, expected, actual):
+        super().__init__(f"расхождение на тике {tick}: ожидался хэш {expected:016x}, получен {actual:016x}")
+        self.tick = tick
+
+
+def load_state(header):
+    return GameState(header["difficulty"], tuple(header["color"]), seed=header["seed"], save_data=header["save"],
+                     daily=header.get("daily"))
+
+
+# Прогон записи без экрана на максимальной скорости. on_tick(tick, state)
+# вызывается после каждого тика; при verify хэши сверяются с записанными.
+def replay(path, verify=True, on_tick=None, stop=None):
+    header, actions, hashes, total = read_replay(path)
+    state = load_state(header)
+    end = total if stop is None else min(stop, total)
+    for tick in range(1, end + 1):
+        state.step(actions.get(tick, 0))
+        if verify and tick in hashes:
+            actual = state.state_hash()
+            if actual != hashes[tick]:
+                raise ReplayDivergence(tick, hashes[tick], actual)
+        if on_tick:
+            on_tick(tick, state)
+    return state, end
+
+
+# Перерисовка кадров start..end (номера тиков) в PNG
+def render_range(path, start, end, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    main.init()
+    main.sprites.bake_all()
+
+    def on_tick(tick, state):
+        if tick >= start:
+            main.draw_game(state)
+            pygame.image.save(main.screen, os.path.join(out_dir, f"frame_{tick:07d}.png"))
+
+    replay(path, on_tick=on_tick, stop=end)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Повтор записанной игры")
+    parser.add_argument("path", help="файл, записанный main.py --record")
+    parser.add_argument("--no-verify", action="store_true", help="не сверять хэши состояния")
+    parser.add_argument("--render", nargs=2, type=int, metavar=("START", "END"),
+                        help="сохранить кадры с START по END тик в PNG")
+    parser.add_argument("--out", default="frames", help="папка для кадров")
+    args = parser.parse_args()
+
+    try:
+        if args.render:
+            render_range(args.path, args.render[0], args.render[1], args.out)
+            print(f"кадры {args.render[0]}..{args.render[1]} сохранены в {args.out}")
+        else:
+            begin = time.perf_counter()
+            state, ticks = replay(args.path, verify=not args.no_verify)
+            elapsed = time.perf_counter() - begin
+            print(f"{ticks} тиков за {elapsed:.2f} с ({ticks / elapsed:,.0f} тиков/с), "
+                  f"очки {state.bird.score}, монеты {state.bird.coins}")
+    except ReplayDivergence as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import math
+import time
+import itertools
+import multiprocessing as mp
+from array import array
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from main import (HEIGHT, DIFFICULTIES, RAINBOW_COLORS, PIPE_GAP, PIPE_MARGIN_TOP, PIPE_MARGIN_BOTTOM, TICK_RATE,
+                  SPAWN_SIZES, SPAWN_COIN, SPAWN_HEART, GameState, Autopilot, MENU, BUY_MAGNET, BUY_SHIELD, BUY_JUMP,
+                  mission_defs)
+from bench import scripted_action
+
+# Задания безголовой игры (без ежедневных) — по колонке-флагу на каждое
+MISSION_IDS = [d["id"] for d in mission_defs()]
+
+# Колонки файла результатов: одна игра — одна строка, каждая колонка —
+# отдельный файл <имя>.bin с типом из array (дописывается по мере прихода игр)
+COLUMNS = [
+    ("difficulty", "b"), ("pipe_speed", "h"), ("enemy_rate", "i"), ("gap", "h"),
+    ("upgrade", "h"), ("cost_step", "h"), ("seed", "q"),
+    ("ticks", "i"), ("died", "b"), ("score", "i"), ("coins", "i"),
+] + [(f"mission_{mission_id}", "b") for mission_id in MISSION_IDS]
+NUMPY_TYPES = {"b": "i1", "h": "i2", "i": "i4", "q": "i8"}
+IMPROVEMENTS = ("magnet_duration", "shield_duration", "jump_power")
+BUY_ACTIONS = {"magnet_duration": BUY_MAGNET, "shield_duration": BUY_SHIELD, "jump_power": BUY_JUMP}
+
+
+# Ячейки сетки: декартово произведение всех осей. Без --pipe-speed/--enemy-rate
+# берутся значения самой сложности.
+def grid(args):
+    cells = []
+    for difficulty in args.difficulty:
+        base = DIFFICULTIES[difficulty]
+        speeds = args.pipe_speed or [base["pipe_speed"]]
+        rates = args.enemy_rate or [base["enemy_rate"]]
+        for cell in itertools.product(speeds, rates, args.gap, args.upgrade, args.cost_step):
+            cells.append((difficulty, *cell))
+    return cells
+
+
+# Покупка: открыть меню и взять самое дешёвое улучшение, на следующем тике закрыть
+class Shopper:
+    def __init__(self, player):
+        self.player = player
+        self.open = False
+
+    def __call__(self, state):
+        if self.open:
+            self.open = False
+            return MENU
+        if state.running:
+            improvements = state.improvements_manager.improvements
+            name = min(IMPROVEMENTS, key=lambda k: improvements[k]["cost"])
+            if state.bird.coins >= improvements[name]["cost"]:
+                self.open = True
+                return MENU | BUY_ACTIONS[name]
+        return self.player(state)
+
+
+def make_player(kind, shop):
+    if kind == "bot":
+        # Без ограничения времени решения бот детерминирован при любой загрузке
+        player = Autopilot(budget_ms=math.inf).decide
+    else:
+        player = scripted_action
+    return Shopper(player) if shop else player
+
+
+# Одна игра до первого конца или max_ticks тиков симуляции
+def play(task):
+    (difficulty, pipe_speed, enemy_rate, gap, upgrade, cost_step), seed, player_kind, shop, max_ticks = task
+    state = GameState(difficulty, RAINBOW_COLORS[2], seed=seed)
+    state.speed = pipe_speed
+    state.level.enemy_rate = enemy_rate
+    state.level.gap = gap
+    manager = state.improvements_manager
+    manager.cost_step = cost_step
+    for name in IMPROVEMENTS:
+        imp = manager.improvements[name]
+        imp["cost"] += cost_step * (upgrade - imp["level"])
+        imp["level"] = upgrade
+    manager.apply_improvements()
+
+    player = make_player(player_kind, shop)
+    steps = 0
+    while not state.game_over and state.ticks < max_ticks and steps < 2 * max_ticks:
+        state.step(player(state))
+        steps += 1
+    bird = state.bird
+    completed = {m["id"]: m["completed"] for m in state.missions_manager.missions}
+    return (list(DIFFICULTIES).index(difficulty), pipe_speed, enemy_rate, gap, upgrade, cost_step, seed,
+            state.ticks, state.game_over, bird.score, bird.coins, *(completed[i] for i in MISSION_IDS))
+
+
+class ColumnWriter:
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.buffers = [array(code) for _, code in COLUMNS]
+        self.files = [open(os.path.join(path, f"{name}.bin"), "wb") for name, _ in COLUMNS]
+        self.rows = 0
+
+    def append(self, row):
+        for buf, value in zip(self.buffers, row):
+            buf.append(value)
+        self.rows += 1
+        if len(self.buffers[0]) >= 4096:
+            self.flush()
+
+    def flush(self):
+        for buf, f in zip(self.buffers, self.files):
+            buf.tofile(f)
+            del buf[:]
+            f.flush()
+
+    def close(self, meta):
+        self.flush()
+        for f in self.files:
+            f.close()
+        meta = dict(meta, rows=self.rows, columns=[{"name": n, "type": NUMPY_TYPES[c]} for n, c in COLUMNS])
+        with open(os.path.join(self.path, "schema.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+# Чтение результатов в словарь колонок NumPy
+def load(path):
+    import numpy as np
+    with open(os.path.join(path, "schema.json"), encoding="utf-8") as f:
+        schema = json.load(f)
+    return {c["name"]: np.fromfile(os.path.join(path, c["name"] + ".bin"), dtype=c["type"])
+            for c in schema["columns"]}
+
+
+# Сводка по ячейке: выживание, очки, монеты и доля выполненных заданий
+class CellStats:
+    def __init__(self):
+        self.ticks = []
+        self.died = self.score = self.coins = 0
+        self.missions = [0] * len(MISSION_IDS)
+
+    def add(self, row):
+        ticks, died, score, coins = row[7:11]
+        self.ticks.append(ticks)
+        self.died += died
+        self.score += score
+        self.coins += coins
+        for k, completed in enumerate(row[11:]):
+            self.missions[k] += completed
+
+    def summary(self):
+        n = len(self.ticks)
+        ticks = sorted(self.ticks)
+        return {
+            "games": n,
+            "survival_s": sum(ticks) / n / TICK_RATE,
+            "survival_p50_s": ticks[n // 2] / TICK_RATE,
+            "death_rate": self.died / n,
+            "score": self.score / n,
+            "coins": self.coins / n,
+            "missions": [m / n for m in self.missions],
+        }
+
+
+def run(args):
+    cells = grid(args)
+    tasks = [(cell, args.seed + i, args.player, args.shop, args.max_ticks)
+             for cell in cells for i in range(args.games)]
+    stats = {cell: CellStats() for cell in cells}
+    writer = ColumnWriter(args.out) if args.out else None
+    names = list(DIFFICULTIES)
+    start = time.perf_counter()
+    done = 0
+    chunksize = max(1, len(tasks) // (64 * (args.workers or os.cpu_count() or 1)))
+    with mp.Pool(args.workers) as pool:
+        for row in pool.imap_unordered(play, tasks, chunksize):
+            stats[(names[row[0]], *row[1:6])].add(row)
+            if writer:
+                writer.append(row)
+            done += 1
+            if done % 100 == 0 or done == len(tasks):
+                print(f"\r{done}/{len(tasks)} игр, {time.perf_counter() - start:.0f} с", end="", file=sys.stderr)
+        # SDL в процессах перехватывает SIGTERM, и terminate() при выходе из with
+        # их не остановит — завершаем пул штатно
+        pool.close()
+        pool.join()
+    print(file=sys.stderr)
+
+    summary = [{"difficulty": cell[0], "pipe_speed": cell[1], "enemy_rate": cell[2], "gap": cell[3],
+                "upgrade": cell[4], "cost_step": cell[5], **stats[cell].summary()} for cell in cells]
+    if writer:
+        writer.close({"player": args.player, "shop": args.shop, "max_ticks": args.max_ticks,
+                      "difficulties": names, "missions": MISSION_IDS, "summary": summary})
+    return summary
+
+
+def print_table(summary):
+    print(f"{'сложность':<10} {'скор.':>5} {'враги':>5} {'просвет':>7} {'ур.':>3} {'шаг':>3} "
+          f"{'жизнь, с':>8} {'смерть':>6} {'очки':>6} {'монеты':>6}  задания")
+    for row in summary:
+        missions = " ".join(f"{m:.2f}" for m in row["missions"])
+        print(f"{row['difficulty']:<10} {row['pipe_speed']:>5} {row['enemy_rate']:>5} {row['gap']:>7} "
+              f"{row['upgrade']:>3} {row['cost_step']:>3} {row['survival_s']:>8.1f} {row['death_rate']:>6.2f} "
+              f"{row['score']:>6.1f} {row['coins']:>6.1f}  {missions}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    # Просвет должен вмещать монеты и сердца и сам помещаться на экран
+    def gap_arg(text):
+        gap = int(text)
+        lo = max(SPAWN_SIZES[SPAWN_COIN], SPAWN_SIZES[SPAWN_HEART]) + 10
+        hi = HEIGHT - PIPE_MARGIN_TOP - PIPE_MARGIN_BOTTOM
+        if not lo <= gap <= hi:
+            raise argparse.ArgumentTypeError(f"просвет должен быть от {lo} до {hi}")
+        return gap
+
+    parser = argparse.ArgumentParser(description="Перебор параметров баланса на безголовых играх")
+    parser.add_argument("--difficulty", action="append", choices=list(DIFFICULTIES),
+                        help="сложности (по умолчанию все)")
+    parser.add_argument("--pipe-speed", type=int, nargs="+", help="скорость труб вместо заданной сложностью")
+    parser.add_argument("--enemy-rate", type=int, nargs="+", help="интервал врагов вместо заданного сложностью")
+    parser.add_argument("--gap", type=gap_arg, nargs="+", default=[PIPE_GAP], help="высота просвета труб")
+    parser.add_argument("--upgrade", type=int, nargs="+", default=[1], help="начальный уровень всех улучшений")
+    parser.add_argument("--cost-step", type=int, nargs="+", default=[10], help="подорожание улучшения за покупку")
+    parser.add_argument("--shop", action="store_true", help="игрок покупает улучшения, как только хватает монет")
+    parser.add_argument("--player", choices=["scripted", "bot"], default="scripted")
+    parser.add_argument("--games", type=int, default=100, help="игр на ячейку")
+    parser.add_argument("--seed", type=int, default=0, help="сид первой игры; в каждой ячейке одни и те же сиды")
+    parser.add_argument("--max-ticks", type=int, default=5 * 60 * TICK_RATE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", help="каталог для колонок результатов по играм")
+    parser.add_argument("--json", help="записать сводку по ячейкам в JSON")
+    args = parser.parse_args()
+    args.difficulty = args.difficulty or list(DIFFICULTIES)
+
+    summary = run(args)
+    print_table(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)